@@ -0,0 +1,87 @@
+"""Microbenchmark of per-request crew setup cost.
+
+Compares building a fresh ThePreview + crew() per request (the old
+behaviour) with checking a pooled instance out of the CrewPool and
+building its Crew, as the request path does. Pooled runs alternate
+defer_image so every iteration assembles a new task list. No LLM or
+network calls are made; only construction is timed.
+
+    python benchmarks/bench_crew_setup.py [iterations]
+"""
+from pathlib import Path
+import os, statistics, sys, threading, time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Placeholder settings so the crew module can be imported without a .env
+os.environ.setdefault("RPM", "60")
+os.environ.setdefault("MODEL", "gpt-4o-mini")
+os.environ.setdefault("TOKENS", "1024")
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("SERPER_API_KEY", "bench")
+os.environ.setdefault("FILE_PATH", "./files")
+os.environ.setdefault("OUTBOUND_FILE_PATH", "http://localhost:8000/files")
+
+from src.the_preview.crew import ThePreview, _parse_yaml, load_yaml_once
+from src.the_preview.crew_pool import CrewPool
+
+
+def stop_rpm_timers():
+    """crewai's RPM controllers re-arm non-daemon timers forever; cancel them so the process can exit"""
+    for thread in threading.enumerate():
+        if isinstance(thread, threading.Timer):
+            thread.cancel()
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<28} mean {statistics.mean(samples):8.3f} ms   p50 {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    config_dir = ROOT / "src" / "the_preview" / "config"
+
+    def parse_cold():
+        _parse_yaml.cache_clear()
+        load_yaml_once(config_dir / "agents.yaml")
+        load_yaml_once(config_dir / "tasks.yaml")
+
+    def parse_cached():
+        load_yaml_once(config_dir / "agents.yaml")
+        load_yaml_once(config_dir / "tasks.yaml")
+
+    def fresh_instance():
+        ThePreview("token").crew()
+
+    pool = CrewPool(max_idle=1)
+    pool.release(pool.acquire("token"))
+    requests_served = iter(range(sys.maxsize))
+
+    def pooled_instance():
+        defer_image = next(requests_served) % 2 == 1
+        with pool.checkout("token", defer_image=defer_image) as instance:
+            instance.crew()
+
+    print(f"Per-request setup cost over {iterations} iterations\n")
+    report("yaml parse (cold)", timed(parse_cold, iterations))
+    report("yaml parse (cached)", timed(parse_cached, iterations))
+    report("ThePreview + crew() (fresh)", timed(fresh_instance, iterations))
+    report("ThePreview + crew() (pooled)", timed(pooled_instance, iterations))
+    print(f"\npool stats: {pool.stats()}")
+    stop_rpm_timers()
+
+
+if __name__ == "__main__":
+    main()
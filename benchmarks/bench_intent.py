@@ -0,0 +1,120 @@
+"""Accuracy and latency of chat intent routing.
+
+Routes a labeled corpus with the previous keyword router (kept here as the
+baseline), the compiled rules, and the rules plus the optional classifier.
+Reports accuracy, wasted playlist crew runs (chat turns routed to the
+playlist crew), missed playlists, and per-call latency. The corpus is held
+out from the classifier's training examples; the script refuses to run if
+they overlap.
+
+    python benchmarks/bench_intent.py [--corpus FILE] [--iterations N]
+"""
+from pathlib import Path
+import argparse, json, re, statistics, sys, time
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+sys.path.insert(0, str(ROOT))
+
+from src.the_preview.intent import INTENT_EXAMPLES_PATH, detect_intent
+
+
+def legacy_detect_intent(message: str) -> str:
+    """The router main.py used before the intent module, bugs included"""
+    playlist_keywords = [
+        'create playlist', 'make playlist', 'create a playlist', 'make a playlist',
+        'make me a playlist', 'create for me a playlist', 'create me a playlist'
+        'songs for', 'music for', 'podcasts for', 'recommendations', "playlist for",
+        "playlist of", "playlist that", "playlist to", "playlist with",
+        "playlist including"
+    ]
+    message_lower = message.lower()
+    if any(keyword in message_lower for keyword in playlist_keywords):
+        return "playlist"
+    if message.split()[0].lower() == "playlist":
+        return "playlist"
+    playlist_intent_pattern = re.compile(
+        r"\b(make|create|build)\b.*\b(list|soundtrack|playlist)\b|\b(list|soundtrack|playlist)\b.*\b(make|create|build)\b",
+        re.IGNORECASE
+    )
+    if playlist_intent_pattern.search(message):
+        return "playlist"
+    return "chat"
+
+
+def training_overlap(corpus) -> list:
+    """Corpus messages that are also classifier training examples"""
+    def norm(text):
+        return " ".join(text.lower().split())
+
+    examples = yaml.safe_load(INTENT_EXAMPLES_PATH.read_text(encoding="utf-8"))
+    trained = {norm(text) for texts in examples.values() for text in texts}
+    return [item["text"] for item in corpus if norm(item["text"]) in trained]
+
+
+ROUTERS = {
+    "legacy keywords": legacy_detect_intent,
+    "compiled rules": lambda m: detect_intent(m, use_classifier=False),
+    "rules + classifier": lambda m: detect_intent(m, use_classifier=True),
+}
+
+
+def evaluate(router, corpus, iterations):
+    correct = wasted = missed = errors = 0
+    samples = []
+    for item in corpus:
+        try:
+            predicted = router(item["text"])
+        except Exception:
+            errors += 1
+            predicted = None
+        correct += predicted == item["label"]
+        wasted += item["label"] == "chat" and predicted == "playlist"
+        missed += item["label"] == "playlist" and predicted != "playlist"
+
+        for _ in range(iterations):
+            start = time.perf_counter()
+            try:
+                router(item["text"])
+            except Exception:
+                pass
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "accuracy": correct / len(corpus),
+        "wasted_crew_runs": wasted,
+        "missed_playlists": missed,
+        "errors": errors,
+        "mean_us": statistics.mean(samples),
+        "p50_us": statistics.median(samples),
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", default=str(FIXTURES / "intent_corpus.jsonl"))
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = [json.loads(line) for line in Path(args.corpus).read_text().splitlines() if line.strip()]
+    overlap = training_overlap(corpus)
+    if overlap:
+        sys.exit(f"{len(overlap)} corpus messages are classifier training examples, e.g. {overlap[0]!r}")
+    # Train the classifier outside the timed loop
+    detect_intent("some music", use_classifier=True)
+
+    print(f"Intent routing over {len(corpus)} labeled messages, {args.iterations} timed calls each\n")
+    for name, router in ROUTERS.items():
+        r = evaluate(router, corpus, args.iterations)
+        print(
+            f"{name:<20} accuracy {r['accuracy']:6.1%}   wasted crew runs {r['wasted_crew_runs']:3}   "
+            f"missed playlists {r['missed_playlists']:3}   errors {r['errors']:2}   "
+            f"mean {r['mean_us']:6.2f} us   p50 {r['p50_us']:6.2f} us   p99 {r['p99_us']:6.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Offline end-to-end crew benchmark.
+
+Runs ThePreview.crew() and chat_crew() against the local stubs in
+offline_stubs.py (scripted LLM, fake Spotify, Serper, scrape targets and
+image endpoint) so crew changes can be measured without spending API
+money. Reports per-stage wall time, LLM call counts and prompt tokens and
+compares them with benchmarks/baselines/offline_e2e.json.
+
+    python benchmarks/bench_offline_e2e.py --runs 3 --llm-latency 0.3
+    python benchmarks/bench_offline_e2e.py --update-baseline
+"""
+from pathlib import Path
+import argparse, json, os, statistics, sys, tempfile, threading, time, uuid
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from offline_stubs import StubServices, FIXTURES
+
+BASELINE_PATH = ROOT / "benchmarks" / "baselines" / "offline_e2e.json"
+# Wall time may drift by this factor before it counts as a regression;
+# call and token counts are deterministic and must not grow at all.
+WALL_TIME_THRESHOLD = 1.25
+
+
+def configure_env(stubs: StubServices, args):
+    env = {
+        "MODEL": "openai/gpt-4o-mini",
+        "TOKENS": "1024",
+        "RPM": "10000",
+        "OPENAI_API_KEY": "sk-offline-stub",
+        "SERPER_API_KEY": "offline-stub",
+        "CLIENT_ID": "offline-stub",
+        "CLIENT_SECRET": "offline-stub",
+        "FILE_PATH": args.workdir,
+        "SPOTIFY_CATALOG_PATH": os.path.join(args.workdir, "spotify_catalog.db"),
+        "IMAGE_INDEX_PATH": os.path.join(args.workdir, "image_index.json"),
+        "OUTBOUND_FILE_PATH": f"{stubs.base_url}/files",
+        # Keep research/scrape caches out of the measurement unless asked for
+        "REDIS_URL": args.redis_url,
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+        # Skips crewai's first-run trace collection and its 20s "view traces?" prompt
+        "CREWAI_TESTING": "true",
+        # Keep markdown dumps and the run log out of the checkout
+        "TASK_OUTPUT_FILES": "0",
+        "RUN_LOG_DIR": os.path.join(args.workdir, "logs"),
+    }
+    env.update(stubs.env())
+    os.environ.update(env)
+
+
+def isolate_caches(workdir: str, run_id: str):
+    """Give every persistent cache a namespace of its own so no run starts warm"""
+    from src.the_preview import cache, llm_cache
+    from src.the_preview.spotify_catalog import spotify_catalog
+    from src.the_preview.tools import image_gen_tool
+
+    namespace = f"bench:{run_id}:"
+    cache.RESEARCH_PREFIX = f"{namespace}research:"
+    cache.SCRAPE_PREFIX = f"{namespace}scrape:"
+    llm_cache.LLM_CACHE_PREFIX = f"{namespace}llmcache:"
+    spotify_catalog.reopen(os.path.join(workdir, f"spotify_catalog-{run_id}.db"))
+    image_gen_tool.IMAGE_INDEX_PATH = os.path.join(workdir, f"image_index-{run_id}.json")
+
+
+def stop_rpm_timers():
+    """crewai's RPM controllers re-arm non-daemon timers forever; cancel them so the process can exit"""
+    for thread in threading.enumerate():
+        if isinstance(thread, threading.Timer):
+            thread.cancel()
+
+
+def run_item(ThePreview, stubs: StubServices, item: dict) -> dict:
+    """Run one corpus item and return per-stage measurements"""
+    instance = ThePreview("offline-user-token")
+    inputs = {"subject": item["subject"], "date": "January 01, 2025"}
+    stages = []
+    marks = {"t": time.perf_counter(), "stats": stubs.stats.snapshot()}
+
+    def on_task_done(task_output):
+        now, stats = time.perf_counter(), stubs.stats.snapshot()
+        # Roles in agents.yaml are folded scalars and keep a trailing newline
+        role = (getattr(task_output, "agent", None) or "unknown").strip()
+        stages.append({
+            "stage": getattr(task_output, "name", None) or "task",
+            "wall_s": now - marks["t"],
+            "llm_calls": stats["llm_calls"].get(role, 0) - marks["stats"]["llm_calls"].get(role, 0),
+            "prompt_tokens": stats["prompt_tokens"].get(role, 0) - marks["stats"]["prompt_tokens"].get(role, 0),
+        })
+        marks.update(t=now, stats=stats)
+
+    # Instance attribute shadows the method that crew() wires up as task_callback
+    instance._task_callback = on_task_done
+    start = time.perf_counter()
+    if item["mode"] == "playlist":
+        instance.load_research(item["subject"])
+        instance.crew().kickoff(inputs=inputs)
+    else:
+        chat_crew = instance.chat_crew()
+        chat_crew.task_callback = on_task_done
+        chat_crew.tasks = [instance.create_chat_task(message=item["subject"], session_id="offline")]
+        chat_crew.kickoff(inputs=inputs)
+    return {"wall_s": time.perf_counter() - start, "stages": stages}
+
+
+def summarize(results: list) -> dict:
+    """Median per (mode, stage) over all runs and items"""
+    summary = {}
+    for mode, run in results:
+        bucket = summary.setdefault(mode, {"total": {"wall_s": []}, "stages": {}})
+        bucket["total"]["wall_s"].append(run["wall_s"])
+        for stage in run["stages"]:
+            entry = bucket["stages"].setdefault(stage["stage"], {"wall_s": [], "llm_calls": [], "prompt_tokens": []})
+            for key in entry:
+                entry[key].append(stage[key])
+
+    def med(values):
+        return round(statistics.median(values), 4) if values else 0
+
+    return {
+        mode: {
+            "total_wall_s": med(bucket["total"]["wall_s"]),
+            "stages": {name: {k: med(v) for k, v in entry.items()} for name, entry in bucket["stages"].items()},
+        }
+        for mode, bucket in summary.items()
+    }
+
+
+def compare(summary: dict, baseline: dict) -> list:
+    regressions = []
+    for mode, data in summary.items():
+        base_mode = baseline.get(mode)
+        if not base_mode:
+            continue
+        for name, stage in data["stages"].items():
+            base = base_mode["stages"].get(name)
+            if not base:
+                continue
+            for key in ("llm_calls", "prompt_tokens"):
+                if stage[key] > base[key]:
+                    regressions.append(f"{mode}/{name}: {key} {base[key]} -> {stage[key]}")
+            if base["wall_s"] and stage["wall_s"] / base["wall_s"] > WALL_TIME_THRESHOLD:
+                regressions.append(f"{mode}/{name}: wall {base['wall_s']:.3f}s -> {stage['wall_s']:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--corpus", default=str(FIXTURES / "offline_corpus.jsonl"))
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--image-latency", type=float, default=0.0)
+    parser.add_argument("--spotify-latency", type=float, default=0.0)
+    parser.add_argument("--serper-latency", type=float, default=0.0)
+    parser.add_argument("--web-latency", type=float, default=0.0)
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:1")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+    if not args.update_baseline and not BASELINE_PATH.exists():
+        parser.error(f"{BASELINE_PATH.relative_to(ROOT)} is missing; run with --update-baseline to create it")
+    args.workdir = tempfile.mkdtemp(prefix="the-preview-bench-")
+
+    stubs = StubServices(latency={
+        "llm": args.llm_latency, "image": args.image_latency, "spotify": args.spotify_latency,
+        "serper": args.serper_latency, "web": args.web_latency,
+    }).start()
+    configure_env(stubs, args)
+
+    # Imported only after the environment points at the stubs
+    from src.the_preview.crew import ThePreview
+
+    corpus = [json.loads(line) for line in Path(args.corpus).read_text().splitlines() if line.strip()]
+    results = []
+    try:
+        for run in range(args.runs):
+            for i, item in enumerate(corpus):
+                isolate_caches(args.workdir, f"{uuid.uuid4().hex[:8]}-{run}-{i}")
+                results.append((item["mode"], run_item(ThePreview, stubs, item)))
+    finally:
+        stubs.stop()
+        stop_rpm_timers()
+
+    summary = summarize(results)
+    for mode, data in summary.items():
+        print(f"\n{mode}: median total {data['total_wall_s']:.3f}s")
+        print(f"  {'stage':<24}{'wall s':>10}{'llm calls':>12}{'prompt tok':>12}")
+        for name, stage in data["stages"].items():
+            print(f"  {name:<24}{stage['wall_s']:>10.3f}{stage['llm_calls']:>12}{stage['prompt_tokens']:>12}")
+    print(f"\nstub calls: {stubs.stats.snapshot()['calls']}")
+
+    if args.update_baseline:
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(summary, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {BASELINE_PATH.relative_to(ROOT)}")
+        return
+
+    regressions = compare(summary, json.loads(BASELINE_PATH.read_text()))
+    if regressions:
+        print("❌ regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("✅ within baseline")
+
+
+if __name__ == "__main__":
+    main()
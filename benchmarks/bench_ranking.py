@@ -0,0 +1,99 @@
+"""Microbenchmark of taste-profile re-ranking.
+
+Scores synthetic candidate batches with the vectorized NumPy scorer and
+with a straightforward per-candidate Python loop (the reference), checks
+they agree, and reports the time per batch. No network calls are made.
+
+    python benchmarks/bench_ranking.py [iterations]
+"""
+from pathlib import Path
+import math, random, statistics, sys, time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from src.the_preview.ranking import ERA_SCALE, FEATURE_WEIGHTS, TasteProfile, feature_matrix, release_year, score_candidates, shortlist
+from src.the_preview.spotify_catalog import normalize
+
+GENRES = ["trip hop", "indie rock", "synthpop", "jazz", "hip hop", "ambient", "soul", "shoegaze", "house", "folk"]
+
+
+def synthetic(rng: random.Random, n_artists: int = 400):
+    artists = [f"Artist {i}" for i in range(n_artists)]
+    genres = {normalize(a): rng.sample(GENRES, 2) for a in artists}
+
+    def track(i):
+        return {
+            "id": f"t{i}",
+            "type": "track",
+            "name": f"Track {i}",
+            "artists": [{"name": a} for a in rng.sample(artists, rng.choice((1, 1, 2)))],
+            "popularity": rng.randint(0, 100),
+            "release_year": str(rng.randint(1965, 2025)),
+            "explicit": rng.random() < 0.3,
+            "external_urls": {"spotify": f"https://open.spotify.com/track/t{i}"},
+        }
+
+    top_artists = [
+        {"name": a, "type": "artist", "genres": genres[normalize(a)], "popularity": rng.randint(20, 90)}
+        for a in rng.sample(artists, 25)
+    ]
+    top_tracks = [track(-i) for i in range(1, 26)]
+    return TasteProfile.from_spotify(top_tracks, top_artists), genres, track
+
+
+def reference_scores(profile: TasteProfile, candidates, artist_genres):
+    """Per-candidate Python implementation of the same scoring"""
+    scores = []
+    for item in candidates:
+        names = [normalize(a["name"]) for a in item["artists"]]
+        artist = max([profile.artist_weights.get(n, 0.0) for n in names] + [0.0])
+        genres = {g for n in names for g in artist_genres.get(n, ())}
+        genre = min(sum(profile.genre_weights.get(g, 0.0) for g in genres), 1.0)
+        popularity = item["popularity"]
+        year = release_year(item)
+        era = 0.5 if profile.year is None or not year else math.exp(-abs(year - profile.year) / ERA_SCALE)
+        explicit = 1.0 - abs(float(item["explicit"]) - profile.explicit_ratio)
+        features = [artist, genre, popularity / 100, 1 - abs(popularity - profile.popularity) / 100, era, explicit]
+        scores.append(sum(w * f for w, f in zip(FEATURE_WEIGHTS.tolist(), features)))
+    return scores
+
+
+def timed(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<32} mean {statistics.mean(samples):9.3f} ms   p50 {statistics.median(samples):9.3f} ms   p95 {p95:9.3f} ms")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rng = random.Random(7)
+    profile, genres, track = synthetic(rng)
+
+    print(f"Taste re-ranking over {iterations} iterations\n")
+    for n in (100, 1_000, 10_000):
+        candidates = [track(i) for i in range(n)]
+        vectorized = score_candidates(profile, candidates, genres)
+        assert np.allclose(vectorized, reference_scores(profile, candidates, genres)), "scorers disagree"
+
+        report(f"{n:>6} candidates (python)", timed(lambda: reference_scores(profile, candidates, genres), iterations))
+        report(f"{n:>6} candidates (numpy)", timed(lambda: score_candidates(profile, candidates, genres), iterations))
+        features = feature_matrix(profile, candidates, genres)
+        report(f"{n:>6} candidates (score only)", timed(lambda: features @ FEATURE_WEIGHTS, iterations))
+        report(f"{n:>6} candidates (shortlist)", timed(lambda: shortlist(profile, candidates, 10, genres), iterations))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Import-time / startup benchmark for the API process.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters,
+summarizes the slowest top-level packages and compares the total against a
+baseline so regressions are visible.
+
+    python benchmarks/bench_startup.py [runs] [--update-baseline]
+    python benchmarks/bench_startup.py --module src.the_preview.crew
+"""
+from pathlib import Path
+import json, os, statistics, subprocess, sys
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = ROOT / "benchmarks" / "baselines" / "startup.json"
+# Fail the comparison when the median import time grows by more than this
+REGRESSION_THRESHOLD = 1.20
+
+
+def import_profile(module: str) -> dict:
+    """Import `module` in a fresh interpreter.
+
+    Returns the total import time and {package: cumulative us}, where each
+    package is charged for its outermost imports only, so nested imports of
+    the same package are not counted twice.
+    """
+    env = dict(os.environ, WARM_CREW_ON_STARTUP="false")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    entries = []  # (depth, name, cumulative us) in the order Python reports them
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        # Nesting is two spaces per level after the one separator space
+        name = raw_name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+
+    packages = {}
+    ancestors = []  # top-level package of each enclosing import
+    # Imports are reported children first; reversed, every parent precedes its children
+    for depth, name, cumulative in reversed(entries):
+        del ancestors[depth:]
+        top = name.split(".")[0]
+        if top not in ancestors:
+            packages[top] = packages.get(top, 0) + cumulative
+        ancestors.append(top)
+    total = sum(cumulative for depth, _, cumulative in entries if depth == 0)
+    return {"total_us": total, "packages": packages}
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    update = "--update-baseline" in sys.argv
+    module = "main"
+    if "--module" in sys.argv:
+        module = sys.argv[sys.argv.index("--module") + 1]
+        args = [a for a in args if a != module]
+    runs = int(args[0]) if args else 5
+
+    profiles = [import_profile(module) for _ in range(runs)]
+    totals_ms = [p["total_us"] / 1000 for p in profiles]
+    median_ms = statistics.median(totals_ms)
+
+    merged = {}
+    for profile in profiles:
+        for name, us in profile["packages"].items():
+            merged.setdefault(name, []).append(us / 1000)
+    slowest = sorted(((statistics.median(v), k) for k, v in merged.items()), reverse=True)[:15]
+
+    print(f"import {module}: median {median_ms:.1f} ms over {runs} runs "
+          f"(min {min(totals_ms):.1f}, max {max(totals_ms):.1f})\n")
+    print("slowest packages (median cumulative ms):")
+    for ms, name in slowest:
+        print(f"  {ms:9.1f}  {name}")
+
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    if update or module not in baselines:
+        baselines[module] = {"median_ms": round(median_ms, 1), "top": {k: round(ms, 1) for ms, k in slowest}}
+        BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\nbaseline written to {BASELINE_PATH.relative_to(ROOT)}")
+        return
+
+    baseline_ms = baselines[module]["median_ms"]
+    ratio = median_ms / baseline_ms if baseline_ms else float("inf")
+    print(f"\nbaseline {baseline_ms:.1f} ms -> now {median_ms:.1f} ms ({ratio:.2f}x)")
+    if ratio > REGRESSION_THRESHOLD:
+        print("❌ import time regression")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
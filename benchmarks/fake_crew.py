@@ -0,0 +1,144 @@
+"""Fake crew for HTTP load tests.
+
+Implements the parts of ThePreview / CrewPool that main.py uses, but
+instead of running agents it sleeps for a configurable time and emits a
+configurable pattern of progress events. Inject it with:
+
+    CREW_POOL_FACTORY=benchmarks.fake_crew:fake_pool uvicorn main:app
+
+Settings (environment):
+    FAKE_CREW_DELAY       total seconds per playlist run (default 2.0)
+    FAKE_CHAT_DELAY       total seconds per chat run (default 0.5)
+    FAKE_CREW_EVENTS      progress events emitted during a playlist run (default 4)
+    FAKE_CREW_FAIL_RATE   fraction of runs that raise (default 0)
+"""
+from types import SimpleNamespace
+import os, random, threading, time
+
+FAKE_CREW_DELAY = float(os.getenv("FAKE_CREW_DELAY", "2.0"))
+FAKE_CHAT_DELAY = float(os.getenv("FAKE_CHAT_DELAY", "0.5"))
+FAKE_CREW_EVENTS = int(os.getenv("FAKE_CREW_EVENTS", "4"))
+FAKE_CREW_FAIL_RATE = float(os.getenv("FAKE_CREW_FAIL_RATE", "0"))
+
+PLAYLIST_RESPONSE = """# Load Test Mix
+
+**Songs**
+
+1.  [Massive Attack: Teardrop](https://open.spotify.com/track/67Hna13dNDkZvBpTXRIaOJ)
+2.  [Portishead: Glory Box](https://open.spotify.com/track/3Ty7OTBNSigGEpeW2PqcsC)
+
+**Podcasts**
+
+1.  [Radiolab](https://open.spotify.com/show/2hmkzUtix0qTqvtpPcMzEL)
+<IMAGE:http://localhost:8000/files/images/loadtest.png>
+"""
+STAGES = ["Searching the web", "Searching Spotify", "Generating an image", "Finalizing results"]
+
+
+class FakeCrew:
+    def __init__(self, owner: "FakeThePreview", delay: float, events: int, response: str):
+        self.owner = owner
+        self.delay = delay
+        self.events = events
+        self.response = response
+        self.tasks = []
+
+    def kickoff(self, inputs=None):
+        steps = max(1, self.events)
+        for i in range(steps):
+            time.sleep(self.delay / steps)
+            if self.owner.cancel_token:
+                self.owner.cancel_token.raise_if_cancelled()
+            if self.events:
+                self.owner._stream_update(STAGES[i % len(STAGES)], "task_complete")
+        if random.random() < FAKE_CREW_FAIL_RATE:
+            raise RuntimeError("fake crew failure")
+        return SimpleNamespace(raw=self.response)
+
+
+class FakeThePreview:
+    """Stand-in for ThePreview with the same per-request surface"""
+
+    def __init__(self, spotify_token=None, defer_image: bool = False):
+        self.bind(spotify_token, defer_image)
+
+    def bind(self, spotify_token, defer_image: bool = False, cancel_token=None, fresh: bool = False):
+        self.spotify_token = spotify_token
+        self.defer_image = defer_image
+        self.cancel_token = cancel_token
+        self.stream_queue = None
+        self._event_loop = None
+        return self
+
+    def reset(self):
+        return self.bind(None)
+
+    def set_event_loop(self, loop):
+        self._event_loop = loop
+
+    def set_stream_queue(self, q):
+        self.stream_queue = q
+
+    def set_cancel_token(self, token):
+        self.cancel_token = token
+
+    def _stream_update(self, message: str, event_type: str = "task_update"):
+        if self.stream_queue and self._event_loop:
+            queue = self.stream_queue
+            self._event_loop.call_soon_threadsafe(
+                lambda: queue.put_nowait({'type': event_type, 'message': message})
+            )
+
+    def load_research(self, subject: str):
+        return None
+
+    def use_research(self, subject: str, research: str):
+        pass
+
+    def research_crew(self):
+        return FakeCrew(self, FAKE_CREW_DELAY / 4, 0, "Fake research facts.")
+
+    def crew(self):
+        response = PLAYLIST_RESPONSE
+        if self.defer_image:
+            response = response.split("<IMAGE:")[0]
+        return FakeCrew(self, FAKE_CREW_DELAY, FAKE_CREW_EVENTS, response)
+
+    def image_crew(self):
+        return FakeCrew(self, FAKE_CREW_DELAY / 4, 0, "<IMAGE:http://localhost:8000/files/images/loadtest.png>")
+
+    def chat_crew(self):
+        return FakeCrew(self, FAKE_CHAT_DELAY, 0, "A short fake chat answer.")
+
+    def create_chat_task(self, message: str, session_id: str, chat_history: str = ""):
+        return SimpleNamespace(description=message)
+
+
+class FakeCrewPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, spotify_token=None, defer_image: bool = False, cancel_token=None, fresh: bool = False) -> FakeThePreview:
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop().bind(spotify_token, defer_image, cancel_token)
+            self.created += 1
+        return FakeThePreview(spotify_token, defer_image).bind(spotify_token, defer_image, cancel_token)
+
+    def release(self, instance):
+        if instance is None:
+            return
+        instance.reset()
+        with self._lock:
+            self._idle.append(instance)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "created": self.created, "reused": self.reused}
+
+
+fake_pool = FakeCrewPool()
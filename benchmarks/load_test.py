@@ -0,0 +1,240 @@
+"""HTTP load test for the FastAPI / Redis / SSE layer.
+
+Starts the API under uvicorn with the fake crew from fake_crew.py (so no
+LLM or Spotify cost) against a local Redis, then drives /api/chat (JSON and
+stream=True), /api/history and /health at increasing concurrency.
+
+Per concurrency level it reports p50/p95/p99 latency per endpoint, SSE
+time-to-first-event and time-to-complete, error rates and server RSS
+growth. /health is probed throughout, so its tail latency shows
+event-loop stalls. A share of stream clients disconnect early to exercise
+save_on_disconnect.
+
+    python benchmarks/load_test.py --levels 10,50,200 --duration 20
+    python benchmarks/load_test.py --redis-url redis://localhost:6379 --crew-delay 1.0
+"""
+from pathlib import Path
+import argparse, asyncio, json, os, random, shutil, socket, subprocess, sys, time
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latency = {}
+        self.errors = {}
+        self.requests = {}
+        self.ttfe = []
+        self.disconnects = 0
+
+    def add(self, name: str, seconds: float, ok: bool):
+        self.requests[name] = self.requests.get(name, 0) + 1
+        if ok:
+            self.latency.setdefault(name, []).append(seconds)
+        else:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def json_chat(client, rec, session_ids, message):
+    start = time.perf_counter()
+    try:
+        resp = await client.post("/api/chat", json={"message": message, "mode": "playlist"})
+        ok = resp.status_code == 200
+        if ok:
+            session_ids.append(resp.json()["session_id"])
+    except httpx.HTTPError:
+        ok = False
+    rec.add("chat_json", time.perf_counter() - start, ok)
+
+
+async def stream_chat(client, rec, session_ids, message, disconnect_ratio):
+    start = time.perf_counter()
+    disconnect = random.random() < disconnect_ratio
+    first_event = None
+    ok = False
+    try:
+        async with client.stream("POST", "/api/chat", json={"message": message, "mode": "playlist", "stream": True}) as resp:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if first_event is None:
+                    first_event = time.perf_counter() - start
+                event = json.loads(line[6:])
+                if event.get("type") == "connected":
+                    session_ids.append(event["session_id"])
+                if disconnect and event.get("type") == "task_complete":
+                    rec.disconnects += 1
+                    ok = True
+                    break
+                if event.get("type") in ("complete", "error"):
+                    ok = event["type"] == "complete"
+                    break
+    except httpx.HTTPError:
+        ok = False
+    if first_event is not None:
+        rec.ttfe.append(first_event)
+    rec.add("chat_stream_disconnect" if disconnect else "chat_stream", time.perf_counter() - start, ok)
+
+
+async def history(client, rec, session_ids):
+    if not session_ids:
+        return
+    start = time.perf_counter()
+    try:
+        resp = await client.get(f"/api/history/{random.choice(session_ids)}")
+        ok = resp.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    rec.add("history", time.perf_counter() - start, ok)
+
+
+async def health_probe(client, rec, stop: asyncio.Event, interval: float):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            ok = (await client.get("/health")).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        rec.add("health", time.perf_counter() - start, ok)
+        await asyncio.sleep(interval)
+
+
+async def run_level(base_url, concurrency, duration, mix, disconnect_ratio):
+    rec = Recorder()
+    session_ids = []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=concurrency + 10, max_keepalive_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(n):
+            while time.perf_counter() < deadline:
+                kind = random.choices(list(mix), weights=list(mix.values()))[0]
+                message = f"Make me a playlist for load test {n}"
+                if kind == "json":
+                    await json_chat(client, rec, session_ids, message)
+                elif kind == "stream":
+                    await stream_chat(client, rec, session_ids, message, disconnect_ratio)
+                else:
+                    await history(client, rec, session_ids)
+
+        probe = asyncio.create_task(health_probe(client, rec, stop, 0.25))
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        stop.set()
+        await probe
+    return rec
+
+
+def print_level(concurrency, rec, rss_before, rss_after):
+    print(f"\n=== concurrency {concurrency} ===")
+    print(f"  {'endpoint':<24}{'reqs':>7}{'err %':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in sorted(rec.requests):
+        lat = [s * 1000 for s in rec.latency.get(name, [])]
+        total = rec.requests[name]
+        err = 100 * rec.errors.get(name, 0) / total if total else 0
+        print(f"  {name:<24}{total:>7}{err:>8.1f}{percentile(lat, 50):>10.1f}{percentile(lat, 95):>10.1f}{percentile(lat, 99):>10.1f}")
+    ttfe = [s * 1000 for s in rec.ttfe]
+    print(f"  SSE time-to-first-event  p50 {percentile(ttfe, 50):.1f} ms  p95 {percentile(ttfe, 95):.1f} ms  p99 {percentile(ttfe, 99):.1f} ms")
+    print(f"  early disconnects        {rec.disconnects}")
+    print(f"  server RSS               {rss_before:.1f} MB -> {rss_after:.1f} MB ({rss_after - rss_before:+.1f} MB)")
+
+
+def start_redis(port: int):
+    binary = shutil.which("redis-server")
+    if not binary:
+        sys.exit("redis-server not found; pass --redis-url to use an existing Redis")
+    return subprocess.Popen(
+        [binary, "--port", str(port), "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    sys.exit(f"server did not come up at {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="10,50,100,200")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--mix", default="json=1,stream=3,history=2", help="relative weights of request kinds")
+    parser.add_argument("--disconnect-ratio", type=float, default=0.1)
+    parser.add_argument("--crew-delay", type=float, default=2.0)
+    parser.add_argument("--crew-events", type=int, default=4)
+    parser.add_argument("--redis-url", default=None, help="use an existing Redis instead of starting one")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    mix = {k: float(v) for k, v in (part.split("=") for part in args.mix.split(","))}
+    redis_proc = None
+    redis_url = args.redis_url
+    if not redis_url:
+        redis_port = free_port()
+        redis_proc = start_redis(redis_port)
+        redis_url = f"redis://127.0.0.1:{redis_port}"
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        REDIS_URL=redis_url,
+        CREW_POOL_FACTORY="benchmarks.fake_crew:fake_pool",
+        FAKE_CREW_DELAY=str(args.crew_delay),
+        FAKE_CREW_EVENTS=str(args.crew_events),
+        WARM_CREW_ON_STARTUP="true",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for(f"{base_url}/health")
+        for level in (int(x) for x in args.levels.split(",")):
+            rss_before = rss_mb(server.pid)
+            rec = asyncio.run(run_level(base_url, level, args.duration, mix, args.disconnect_ratio))
+            # Let background saves from disconnected streams finish before sampling memory
+            time.sleep(args.crew_delay + 1)
+            print_level(level, rec, rss_before, rss_mb(server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+        if redis_proc:
+            redis_proc.terminate()
+            redis_proc.wait()
+
+
+if __name__ == "__main__":
+    main()
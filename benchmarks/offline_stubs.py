@@ -0,0 +1,257 @@
+"""Local stand-ins for every external service a crew run touches.
+
+One threaded HTTP server exposes:
+
+    /llm/v1/chat/completions        scripted OpenAI-compatible LLM
+    /llm/v1/images/generations      OpenAI image endpoint (tiny PNGs)
+    /spotify-accounts/api/token     Spotify client-credentials token
+    /spotify/v1/...                 Spotify search, top items and saved items
+    /serper/search                  Serper web search
+    /web/page/<slug>                scrape targets for the researcher
+
+The LLM answers from a script keyed by agent role: the Nth assistant turn
+of a conversation gets the Nth scripted response for that role, so runs are
+deterministic and exercise the same tool calls every time.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+import base64, json, re, struct, threading, time, zlib
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+ROLES = [
+    "Conversational Assistant",
+    "Strategic Manager",
+    "Playlist Creator",
+    "Image Generator",
+    "Researcher",
+]
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def tiny_png(seed: int) -> bytes:
+    """A valid 1x1 PNG whose colour depends on `seed`"""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    pixel = bytes([0, seed % 256, (seed * 7) % 256, (seed * 13) % 256])
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(pixel))
+        + chunk(b"IEND", b"")
+    )
+
+
+class StubStats:
+    """Thread-safe counters for calls made against the stubs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.llm_calls = {}
+            self.prompt_tokens = {}
+            self.completion_tokens = {}
+
+    def record(self, service: str):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+
+    def record_llm(self, role: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.llm_calls[role] = self.llm_calls.get(role, 0) + 1
+            self.prompt_tokens[role] = self.prompt_tokens.get(role, 0) + prompt_tokens
+            self.completion_tokens[role] = self.completion_tokens.get(role, 0) + completion_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": dict(self.calls),
+                "llm_calls": dict(self.llm_calls),
+                "prompt_tokens": dict(self.prompt_tokens),
+                "completion_tokens": dict(self.completion_tokens),
+            }
+
+
+class StubServices:
+    """Runs the stub server in a background thread"""
+
+    def __init__(self, latency: Optional[Dict[str, float]] = None, script_path: Path = FIXTURES / "offline_script.json"):
+        self.latency = {"llm": 0.0, "image": 0.0, "spotify": 0.0, "serper": 0.0, "web": 0.0}
+        self.latency.update(latency or {})
+        self.script = json.loads(Path(script_path).read_text())
+        self.stats = StubStats()
+        self._image_seed = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Environment that points the crew at these stubs"""
+        base = self.base_url
+        return {
+            "OPENAI_API_BASE": f"{base}/llm/v1",
+            "OPENAI_BASE_URL": f"{base}/llm/v1",
+            "SPOTIFY_API_URL": f"{base}/spotify/v1",
+            "SPOTIFY_ACCOUNTS_URL": f"{base}/spotify-accounts",
+            "SERPER_BASE_URL": f"{base}/serper",
+        }
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ----- responders -----
+
+    def _fill(self, text: str) -> str:
+        return text.replace("{stub}", self.base_url)
+
+    def chat_completion(self, body: dict) -> dict:
+        messages = body.get("messages", [])
+        system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        prompt = system or (messages[0].get("content") or "" if messages else "")
+        role = next((r for r in ROLES if f"You are {r}" in prompt), "unknown")
+        step = sum(1 for m in messages if m.get("role") == "assistant")
+
+        script = self.script.get(role) or self.script["default"]
+        content = self._fill(script[min(step, len(script) - 1)])
+
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = count_tokens(content)
+        self.stats.record_llm(role, prompt_tokens, completion_tokens)
+        return {
+            "id": f"chatcmpl-stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def image_generation(self, body: dict) -> dict:
+        self._image_seed += 1
+        return {
+            "created": int(time.time()),
+            "data": [{"b64_json": base64.b64encode(tiny_png(self._image_seed)).decode()}],
+        }
+
+    def spotify(self, path: str, query: Dict[str, str]) -> dict:
+        catalog = self.script["spotify"]
+        if path.endswith("/search"):
+            search_type = query.get("type", "track")
+            key = {"track": "tracks", "episode": "episodes", "show": "shows", "artist": "artists",
+                   "album": "albums", "playlist": "playlists"}.get(search_type, "tracks")
+            items = catalog.get(key, [])[: int(query.get("limit", 5))]
+            return {key: {"items": items}}
+        match = re.search(r"/me/top/(tracks|artists)$", path)
+        if match:
+            return {"items": catalog.get(match.group(1), [])}
+        match = re.search(r"/me/(shows|episodes)$", path)
+        if match:
+            nested = match.group(1).rstrip("s")
+            return {"items": [{"added_at": "2025-01-01T00:00:00Z", nested: item} for item in catalog.get(match.group(1), [])]}
+        return {}
+
+    def serper(self, body: dict) -> dict:
+        base = self.base_url
+        return {
+            "searchParameters": {"q": body.get("q", "")},
+            "organic": [
+                {"title": page["title"], "link": f"{base}/web/page/{slug}", "snippet": page["snippet"], "position": i + 1}
+                for i, (slug, page) in enumerate(self.script["pages"].items())
+            ],
+        }
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload, content_type="application/json"):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    return json.loads(raw) if raw else {}
+                except ValueError:
+                    return {}
+
+            def _service(self, path: str) -> str:
+                if path.startswith("/llm/v1/images"):
+                    return "image"
+                return path.strip("/").split("/")[0].replace("spotify-accounts", "spotify")
+
+            def _route(self, method: str):
+                path, _, qs = self.path.partition("?")
+                query = dict(p.split("=", 1) for p in qs.split("&") if "=" in p)
+                service = self._service(path)
+                services.stats.record(service)
+                time.sleep(services.latency.get(service, 0.0))
+
+                if method == "POST" and path.endswith("/chat/completions"):
+                    return self._send(200, services.chat_completion(self._body()))
+                if method == "POST" and path.endswith("/images/generations"):
+                    return self._send(200, services.image_generation(self._body()))
+                if path == "/spotify-accounts/api/token":
+                    self._body()
+                    return self._send(200, {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+                if path.startswith("/spotify/v1/"):
+                    return self._send(200, services.spotify(path, query))
+                if path.startswith("/serper/"):
+                    return self._send(200, services.serper(self._body()))
+                if path.startswith("/web/page/"):
+                    page = services.script["pages"].get(path.rsplit("/", 1)[-1])
+                    if page:
+                        return self._send(200, page["html"].encode(), "text/html; charset=utf-8")
+                return self._send(404, {"error": "not found"})
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+        return Handler
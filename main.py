@@ -1,21 +1,54 @@
-from src.the_preview.crew import ThePreview
-from fastapi import FastAPI, HTTPException
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.the_preview.cancellation import CancelToken, CrewCancelled, CANCEL_PREFIX, CANCEL_TTL, RUN_PREFIX
+from src.the_preview.metrics import metrics
+from src.the_preview.run_log import run_log
+from src.the_preview.intent import detect_intent
+from src.the_preview import session_codec
+from src.the_preview.prefetch import (
+    likely_subject, is_follow_up, mentions_subject, speculation_budget,
+    PREFETCH_ENABLED, PREFETCH_TTL, PREFETCH_PREFIX,
+)
+from src.the_preview.image_store import (
+    negotiate_variant, strong_etag, touch_access, enforce_disk_quota,
+    IMAGE_JANITOR_INTERVAL, IMMUTABLE_CACHE_CONTROL,
+)
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, TYPE_CHECKING
 from datetime import datetime, timedelta
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import redis.asyncio as redis
 import uuid, os, json, asyncio, re
 
+# The crew stack (crewai, crewai_tools, openai) takes seconds to import, so it is
+# loaded lazily: warmed in a background thread at startup or on the first crew request.
+if TYPE_CHECKING:
+    from src.the_preview.crew import ThePreview
+    from src.the_preview.crew_pool import CrewPool
+
+WARM_CREW_ON_STARTUP = os.getenv("WARM_CREW_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# "module:attribute" of an alternative crew pool, e.g. the fake crew used by the load tests
+CREW_POOL_FACTORY = os.getenv("CREW_POOL_FACTORY")
+# Threads available to crew runs; a cancelled run frees its thread at its next step
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", "16"))
+# What to do with a streaming run whose client disconnects: "save" finishes and stores it, "cancel" stops it
+DISCONNECT_POLICY = os.getenv("DISCONNECT_POLICY", "save")
+BATCH_MAX_SUBJECTS = int(os.getenv("BATCH_MAX_SUBJECTS", "100"))
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "4"))
+# How long a playlist request waits for this session's in-flight speculative research
+PREFETCH_WAIT = float(os.getenv("PREFETCH_WAIT", "60"))
+
 app = FastAPI()
 
 # Create static directory if it doesn't exist
-Path("./files/images").mkdir(parents=True, exist_ok=True)
-# Mount static files directory at /files to match URL structure
-app.mount("/files", StaticFiles(directory="./files"), name="files")
+IMAGES_DIR = "./files/images"
+Path(IMAGES_DIR).mkdir(parents=True, exist_ok=True)
 
 # CORS middleware for Next.js
 app.add_middleware(
@@ -31,6 +64,10 @@ SESSION_TIMEOUT = timedelta(hours=1)
 redis_client = redis.from_url(
     os.getenv("REDIS_URL", "redis://localhost:6379"), decode_responses=True
 )
+# Session message lists are stored as encoded (possibly compressed) bytes
+redis_binary = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
+# Session keys sampled with MEMORY USAGE for /metrics
+SESSION_MEMORY_SAMPLE = int(os.getenv("SESSION_MEMORY_SAMPLE", "20"))
 
 test_result = """
 # The Matrix:
@@ -70,6 +107,11 @@ class ChatMessage(BaseModel):
     mode: str = "auto"  # "auto", "chat", "playlist"
     image_url: Optional[str] = None  # For image inputs
     stream: bool = False  # Enable streaming
+    defer_image: bool = False  # Return the playlist first, deliver the image later
+    request_id: Optional[str] = None  # Client-chosen run id, usable with DELETE /api/chat/{run_id}
+    on_disconnect: Optional[str] = None  # "save" or "cancel"; defaults to DISCONNECT_POLICY
+    cancel_previous: bool = False  # Cancel this session's still-running request
+    fresh: bool = False  # "Give me something different": bypass the LLM completion cache
 
 class ChatResponse(BaseModel):
     response: str
@@ -77,12 +119,40 @@ class ChatResponse(BaseModel):
     mode: str
     timestamp: str
     images: Optional[List[str]] = None  # For image outputs (URLs)
+    request_id: Optional[str] = None
+    image_status_url: Optional[str] = None  # Poll for a deferred image
+
+class ImageStatus(BaseModel):
+    request_id: str
+    status: str  # "pending", "ready", "failed"
+    images: Optional[List[str]] = None
+    error: Optional[str] = None
+
+class BatchPlaylistRequest(BaseModel):
+    subjects: List[str]
+    spotify_user_token: Optional[str] = None
+    include_image: bool = True
+    max_parallel: Optional[int] = None  # Capped at BATCH_MAX_PARALLEL
+    request_id: Optional[str] = None  # Cancels the whole batch via DELETE /api/chat/{run_id}
 
 class ConversationHistory(BaseModel):
     messages: List[Dict[str, Any]]
 
 # ----- REDIS -----
 
+async def read_messages(session_id: str) -> List[Dict[str, Any]]:
+    """Decode a session's stored message list"""
+    return session_codec.decode(await redis_binary.hget(session_id, "messages"))
+
+async def write_messages(session_id: str, messages: List[Dict[str, Any]], **fields: str):
+    """Trim a session's messages to the caps, encode and store them"""
+    messages, dropped = session_codec.trim(messages)
+    payload = session_codec.encode(messages)
+    if dropped:
+        metrics.incr("session_messages_trimmed", dropped)
+    metrics.incr("session_bytes_written", len(payload))
+    await redis_binary.hset(session_id, mapping={"messages": payload, **fields})
+
 async def get_or_create_session(session_id: Optional[str] = None) -> str:
     """Get existing Redis session or create a new one"""
     if session_id and await redis_client.exists(session_id):
@@ -91,19 +161,17 @@ async def get_or_create_session(session_id: Optional[str] = None) -> str:
         return session_id
 
     new_session_id = session_id or str(uuid.uuid4())
-    data = {
-        "created": datetime.now().isoformat(),
-        "last_active": datetime.now().isoformat(),
-        "messages": json.dumps([]),
-    }
-    await redis_client.hset(new_session_id, mapping=data)
+    await write_messages(
+        new_session_id, [],
+        created=datetime.now().isoformat(),
+        last_active=datetime.now().isoformat(),
+    )
     await redis_client.expire(new_session_id, int(SESSION_TIMEOUT.total_seconds()))
     return new_session_id
 
-async def store_message(session_id: str, role: str, content: str, mode: str, images: Optional[List[str]] = None):
+async def store_message(session_id: str, role: str, content: str, mode: str, images: Optional[List[str]] = None, request_id: Optional[str] = None):
     """Store a message in Redis"""
-    session = await redis_client.hgetall(session_id)
-    messages = json.loads(session.get("messages", "[]"))
+    messages = await read_messages(session_id)
     msg = {
         "role": role,
         "content": content,
@@ -112,17 +180,15 @@ async def store_message(session_id: str, role: str, content: str, mode: str, ima
     }
     if images:
         msg["images"] = images
+    if request_id:
+        msg["request_id"] = request_id
     messages.append(msg)
-    await redis_client.hset(session_id, mapping={
-        "messages": json.dumps(messages),
-        "last_active": datetime.now().isoformat()
-    })
+    await write_messages(session_id, messages, last_active=datetime.now().isoformat())
     await redis_client.expire(session_id, int(SESSION_TIMEOUT.total_seconds()))
 
 async def update_session_token(session_id: str, spotify_user_token: str):
     """Update the Spotify user token in the session stored in Redis."""
-    session = await redis_client.hgetall(session_id)
-    if not session: 
+    if not await redis_client.exists(session_id):
       return
     await redis_client.hset(session_id, mapping={
         "spotify_user_token": spotify_user_token,
@@ -130,42 +196,166 @@ async def update_session_token(session_id: str, spotify_user_token: str):
 
 async def get_session_messages(session_id: str) -> List[Dict[str, Any]]:
     """Retrieve messages for a session"""
-    session = await redis_client.hgetall(session_id)
-    return json.loads(session.get("messages", "[]")) if session else []
+    return await read_messages(session_id)
 
 async def delete_session(session_id: str):
     """Delete a session"""
     await redis_client.delete(session_id)
 
+async def attach_images_to_message(session_id: str, request_id: str, images: List[str]):
+    """Add deferred images to the stored llm message for a request"""
+    messages = await read_messages(session_id)
+    for msg in reversed(messages):
+        if msg.get("request_id") == request_id and msg["role"] == "llm":
+            msg["images"] = msg.get("images", []) + images
+            break
+    else:
+        return
+    await write_messages(session_id, messages)
+
+async def session_memory() -> Dict[str, Any]:
+    """Redis memory used by a sample of sessions (MEMORY USAGE includes key overhead)"""
+    sizes = []
+    async for key in redis_client.scan_iter(count=200):
+        # Auxiliary keys (image jobs, cancellations, caches) are namespaced with a colon
+        if ":" in key:
+            continue
+        usage = await redis_client.memory_usage(key)
+        if usage:
+            sizes.append(usage)
+        if len(sizes) >= SESSION_MEMORY_SAMPLE:
+            break
+    if not sizes:
+        return {"sampled": 0}
+    return {"sampled": len(sizes), "mean_bytes": sum(sizes) // len(sizes), "max_bytes": max(sizes)}
+
+IMAGE_JOB_PREFIX = "image_job:"
+
+async def set_image_job(request_id: str, status: str, images: Optional[List[str]] = None, error: Optional[str] = None):
+    """Record the status of a deferred image generation"""
+    key = f"{IMAGE_JOB_PREFIX}{request_id}"
+    await redis_client.hset(key, mapping={
+        "status": status,
+        "images": json.dumps(images or []),
+        "error": error or "",
+    })
+    await redis_client.expire(key, int(SESSION_TIMEOUT.total_seconds()))
+
+async def get_image_job(request_id: str) -> Optional[Dict[str, Any]]:
+    """Retrieve the status of a deferred image generation"""
+    job = await redis_client.hgetall(f"{IMAGE_JOB_PREFIX}{request_id}")
+    if not job:
+        return None
+    return {
+        "request_id": request_id,
+        "status": job["status"],
+        "images": json.loads(job.get("images", "[]")) or None,
+        "error": job.get("error") or None,
+    }
 
-# ----- API -----
+async def set_prefetch(session_id: str, subject: str, research: str):
+    """Keep speculative research for a session's likely follow-up"""
+    await redis_client.set(
+        f"{PREFETCH_PREFIX}{session_id}", json.dumps({"subject": subject, "research": research}), ex=PREFETCH_TTL
+    )
 
-def detect_intent(message: str) -> str:
-    """Detect if user wants a playlist or just wants to chat"""
-    playlist_keywords = [
-        'create playlist', 'make playlist', 'create a playlist', 'make a playlist',
-        'make me a playlist', 'create for me a playlist', 'create me a playlist'
-        'songs for', 'music for', 'podcasts for', 'recommendations', "playlist for",
-        "playlist of", "playlist that", "playlist to", "playlist with", 
-        "playlist including"
-    ]
-    
-    message_lower = message.lower()
-    if any(keyword in message_lower for keyword in playlist_keywords):
-        return "playlist"
+async def get_prefetch(session_id: str) -> Optional[Dict[str, str]]:
+    """Retrieve speculative research for a session"""
+    raw = await redis_client.get(f"{PREFETCH_PREFIX}{session_id}")
+    return json.loads(raw) if raw else None
 
-    if message.split()[0].lower() == "playlist":
-        return "playlist"
 
-    # Add an additional regex-based check for intent detection
-    # Regex should capture phrases relating to "make/create" and "list/soundtrack/playlist"
-    playlist_intent_pattern = re.compile(
-        r"\b(make|create|build)\b.*\b(list|soundtrack|playlist)\b|\b(list|soundtrack|playlist)\b.*\b(make|create|build)\b",
-        re.IGNORECASE
-    )
-    if playlist_intent_pattern.search(message):
-        return "playlist"
-    return "chat"
+
+# ----- CREW -----
+
+_crew_pool = None
+
+def load_crew_pool() -> "CrewPool":
+    """Import the crew stack and return the shared crew pool"""
+    global _crew_pool
+    if _crew_pool is None:
+        if CREW_POOL_FACTORY:
+            import importlib
+            module_name, _, attribute = CREW_POOL_FACTORY.partition(":")
+            _crew_pool = getattr(importlib.import_module(module_name), attribute)
+        else:
+            from src.the_preview.crew_pool import crew_pool
+            from src.the_preview.crew import KNOWLEDGE_AGENTS
+            if KNOWLEDGE_AGENTS:
+                # Embed new or changed knowledge/ files now rather than on the first tool call
+                from src.the_preview.knowledge_index import knowledge_index
+                try:
+                    knowledge_index()
+                except Exception as e:
+                    print(f"Knowledge index build failed: {e}")
+            _crew_pool = crew_pool
+    return _crew_pool
+
+async def get_crew_pool() -> "CrewPool":
+    """Return the crew pool, importing the crew stack off the event loop on first use"""
+    if _crew_pool is not None:
+        return _crew_pool
+    return await asyncio.to_thread(load_crew_pool)
+
+def release_crew(crew_instance: Optional["ThePreview"]):
+    """Return a crew instance to the pool"""
+    load_crew_pool().release(crew_instance)
+
+crew_executor = ThreadPoolExecutor(max_workers=CREW_WORKERS, thread_name_prefix="crew")
+active_runs: Dict[str, CancelToken] = {}
+session_runs: Dict[str, str] = {}  # session id -> request id of its running crew
+
+metrics.register_gauge("runs_active", lambda: len(active_runs))
+
+def _in_worker(fn):
+    """Run fn on a crew worker, tracking how many workers are busy"""
+    metrics.incr("crew_workers_busy")
+    try:
+        return fn()
+    finally:
+        metrics.incr("crew_workers_busy", -1)
+
+async def run_in_crew_executor(fn):
+    """Run a blocking crew call without stalling the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(crew_executor, _in_worker, fn)
+
+async def register_run(request_id: str, running: bool):
+    """Mirror a run's registration in Redis so a cancel on any worker can tell whether it is live"""
+    try:
+        if running:
+            await redis_client.set(f"{RUN_PREFIX}{request_id}", "1", ex=CANCEL_TTL)
+        else:
+            # Drop any cancel flag too, so a client reusing the request_id starts clean
+            await redis_client.delete(f"{RUN_PREFIX}{request_id}", f"{CANCEL_PREFIX}{request_id}")
+    except Exception as e:
+        print(f"Run registry error: {e}")
+
+def start_run(request_id: str, session_id: str, cancel_previous: bool = False) -> CancelToken:
+    """Register a cancellable run, optionally cancelling the session's previous one"""
+    previous = session_runs.get(session_id)
+    if cancel_previous and previous in active_runs:
+        active_runs[previous].cancel()
+        metrics.incr("runs_superseded")
+    token = CancelToken(request_id, session_id)
+    active_runs[request_id] = token
+    session_runs[session_id] = request_id
+    asyncio.create_task(register_run(request_id, True))
+    metrics.incr("runs_started")
+    run_log.emit({"event": "run_started", "session_id": session_id, "run_id": request_id})
+    return token
+
+def finish_run(request_id: str, session_id: str, status: str = "finished"):
+    """Unregister a run; status is one of finished, failed or cancelled"""
+    if active_runs.pop(request_id, None) is None:
+        return  # already finished
+    if session_runs.get(session_id) == request_id:
+        del session_runs[session_id]
+    asyncio.create_task(register_run(request_id, False))
+    metrics.incr(f"runs_{status}")
+    run_log.emit({"event": f"run_{status}", "session_id": session_id, "run_id": request_id})
+
+
+# ----- API -----
 
 def extract_images_from_result(result: any) -> tuple[str, List[str]]:
     """Extract image URLs from CrewAI result and return cleaned text + images"""
@@ -204,6 +394,112 @@ def extract_images_from_result(result: any) -> tuple[str, List[str]]:
     
     return cleaned_text, unique_images
 
+async def run_deferred_image(crew_instance: "ThePreview", crew_inputs: Dict[str, Any], session_id: str, request_id: str) -> List[str]:
+    """Generate the playlist image after the playlist has been returned.
+
+    Takes over the crew instance and returns it to the pool when done. The
+    caller marks the job pending before handing off, so it can be polled
+    as soon as the playlist is returned.
+    """
+    try:
+        result = await run_in_crew_executor(
+            lambda: crew_instance.image_crew().kickoff(inputs=crew_inputs)
+        )
+        _, images = extract_images_from_result(result)
+        await set_image_job(request_id, "ready", images=images)
+        if images:
+            await attach_images_to_message(session_id, request_id, images)
+        print(f"🖼️  Deferred image ready for {request_id}")
+        return images
+    except CrewCancelled:
+        await set_image_job(request_id, "cancelled")
+        metrics.incr("runs_cancelled")
+        return []
+    except Exception as e:
+        print(f"❌ Deferred image error: {str(e)}")
+        await set_image_job(request_id, "failed", error=str(e))
+        return []
+    finally:
+        release_crew(crew_instance)
+
+prefetch_tasks: Dict[str, Tuple[str, asyncio.Task]] = {}  # session id -> (subject, in-flight speculative research)
+
+metrics.register_gauge("prefetch_budget", speculation_budget.stats)
+
+async def run_prefetch(session_id: str, subject: str, spotify_token: Optional[str]):
+    """Research a likely playlist subject (and warm the taste profile) in the background"""
+    try:
+        crew_pool = await get_crew_pool()
+        crew_instance = crew_pool.acquire(spotify_token, cancel_token=CancelToken(f"prefetch-{uuid.uuid4()}", session_id))
+        try:
+            def research():
+                if spotify_token:
+                    # Fills the shared taste-profile cache the playlist run reads from
+                    taste = crew_instance.taste_profile_tool()
+                    for data_type in ("top_tracks", "top_artists"):
+                        taste._run(data_type, "medium_term", 25)
+                cached = crew_instance.load_research(subject)
+                if cached:
+                    return cached
+                inputs = {"subject": subject, "date": datetime.now().strftime("%B %d, %Y")}
+                return str(crew_instance.research_crew().kickoff(inputs=inputs).raw)
+
+            await set_prefetch(session_id, subject, await run_in_crew_executor(research))
+            metrics.incr("prefetch_completed")
+        finally:
+            release_crew(crew_instance)
+    except Exception as e:
+        metrics.incr("prefetch_failed")
+        print(f"❌ Prefetch error: {str(e)}")
+    finally:
+        speculation_budget.release()
+        prefetch_tasks.pop(session_id, None)
+
+def maybe_prefetch(chat_message: ChatMessage, session_id: str, mode: str):
+    """Start speculative research when auto mode routes a message about a movie to chat"""
+    if not PREFETCH_ENABLED or chat_message.mode != "auto" or mode != "chat" or session_id in prefetch_tasks:
+        return
+    subject = likely_subject(chat_message.message)
+    if not subject:
+        return
+    if not speculation_budget.try_acquire():
+        metrics.incr("prefetch_skipped_budget")
+        return
+    metrics.incr("prefetch_started")
+    prefetch_tasks[session_id] = (subject, asyncio.create_task(
+        run_prefetch(session_id, subject, chat_message.spotify_user_token)
+    ))
+
+async def consume_prefetch(chat_message: ChatMessage, session_id: str, crew_inputs: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Speculative research for this session, if the playlist request follows up on it"""
+    follow_up = is_follow_up(chat_message.message)
+    in_flight = prefetch_tasks.get(session_id)
+    if in_flight:
+        subject, task = in_flight
+        # Only worth waiting for research this request is going to use
+        if follow_up or mentions_subject(chat_message.message, subject):
+            try:
+                await asyncio.wait_for(asyncio.shield(task), PREFETCH_WAIT)
+            except asyncio.TimeoutError:
+                pass
+    try:
+        prefetched = await get_prefetch(session_id)
+    except Exception as e:
+        print(f"❌ Prefetch lookup error: {str(e)}")
+        return None
+    if not prefetched:
+        return None
+    if not (follow_up or mentions_subject(chat_message.message, prefetched["subject"])):
+        return None
+    if follow_up:
+        # "ok make me a playlist" -> "ok make me a playlist for The Matrix"
+        crew_inputs["subject"] = f"{chat_message.message} for {prefetched['subject']}"
+    metrics.incr("prefetch_used")
+    return prefetched
+
+def image_status_url(request_id: str) -> str:
+    return f"/api/images/{request_id}"
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(chat_message: ChatMessage):
     """Handle both chat and playlist requests"""
@@ -246,43 +542,79 @@ async def chat_endpoint(chat_message: ChatMessage):
         }
         if chat_message.image_url:
             crew_inputs['image_url'] = chat_message.image_url
+        prefetched = await consume_prefetch(chat_message, session_id, crew_inputs) if mode == "playlist" else None
+        maybe_prefetch(chat_message, session_id, mode)
 
-        crew_instance = ThePreview(chat_message.spotify_user_token)
-        
-        # Execute appropriate crew workflow
-        if mode == "playlist":
-            # Run full playlist crew
-            result = crew_instance.crew().kickoff(inputs=crew_inputs)
-            response = str(result.raw) if hasattr(result, 'raw') else str(result)
-            response, images = extract_images_from_result(result)
-        else:
-            # Run lightweight chat crew
-            chat_crew = crew_instance.chat_crew()
-            chat_task = crew_instance.create_chat_task(
-                message=chat_message.message,
-                session_id=session_id,
-                chat_history=chat_history
+        request_id = chat_message.request_id or str(uuid.uuid4())
+        defer_image = chat_message.defer_image and mode == "playlist"
+        cancel_token = start_run(request_id, session_id, chat_message.cancel_previous)
+        run_status = "failed"
+        try:
+            crew_pool = await get_crew_pool()
+            crew_instance = crew_pool.acquire(
+                chat_message.spotify_user_token, defer_image=defer_image, cancel_token=cancel_token,
+                fresh=chat_message.fresh,
             )
-            chat_crew.tasks = [chat_task]
-            result = chat_crew.kickoff(inputs=crew_inputs)
-            response = str(result.raw) if hasattr(result, 'raw') else str(result)
-            response, images = extract_images_from_result(result)
+
+            def run_crew():
+                cancel_token.raise_if_cancelled()
+                if mode == "playlist":
+                    # Run full playlist crew
+                    if prefetched:
+                        crew_instance.use_research(prefetched["subject"], prefetched["research"])
+                    else:
+                        crew_instance.load_research(chat_message.message)
+                    return crew_instance.crew().kickoff(inputs=crew_inputs)
+                # Run lightweight chat crew
+                chat_crew = crew_instance.chat_crew()
+                chat_task = crew_instance.create_chat_task(
+                    message=chat_message.message,
+                    session_id=session_id,
+                    chat_history=chat_history
+                )
+                chat_crew.tasks = [chat_task]
+                return chat_crew.kickoff(inputs=crew_inputs)
+
+            # Execute appropriate crew workflow
+            completed = False
+            try:
+                result = await run_in_crew_executor(run_crew)
+                response, images = extract_images_from_result(result)
+                completed = True
+            except CrewCancelled:
+                run_status = "cancelled"
+                print(f"🛑 Run {request_id} cancelled")
+                raise HTTPException(status_code=409, detail="Run cancelled")
+            finally:
+                if not (defer_image and completed):
+                    release_crew(crew_instance)
+            run_status = "finished"
+        finally:
+            finish_run(request_id, session_id, run_status)
         
         await store_message(session_id, "user", chat_message.message, mode)
-        await store_message(session_id, "llm", response, mode, images=images)
+        await store_message(session_id, "llm", response, mode, images=images, request_id=request_id)
         messages = await get_session_messages(session_id)
         
         print(f"✅ Total messages now: {len(messages)}")
         print(f"🖼️  Images in response: {len(images)}")
+
+        if defer_image:
+            await set_image_job(request_id, "pending")
+            asyncio.create_task(run_deferred_image(crew_instance, crew_inputs, session_id, request_id))
         
         return ChatResponse(
             response=response,
             session_id=session_id,
             mode=mode,
             timestamp=datetime.now().isoformat(),
-            images=images if images else None
+            images=images if images else None,
+            request_id=request_id,
+            image_status_url=image_status_url(request_id) if defer_image else None,
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -292,117 +624,280 @@ async def stream_crew_progress(chat_message: ChatMessage):
     """Stream CrewAI progress updates as SSE with async queue."""
     
     session_id = await get_or_create_session(chat_message.session_id)
-    crew_instance = ThePreview(chat_message.spotify_user_token)
-
-    main_loop = asyncio.get_running_loop()
-    crew_instance.set_event_loop(main_loop)
+    request_id = chat_message.request_id or str(uuid.uuid4())
+    cancel_token = start_run(request_id, session_id, chat_message.cancel_previous)
+    disconnect_policy = chat_message.on_disconnect or DISCONNECT_POLICY
+    crew_result = {'result': None, 'error': None, 'status': 'failed'}
+    crew_instance = None
+    executor_future = None
+    # Set once save_on_disconnect owns finishing the run
+    saving_in_background = False
+    try:
+        crew_pool = await get_crew_pool()
+        crew_instance = crew_pool.acquire(
+            chat_message.spotify_user_token, cancel_token=cancel_token, fresh=chat_message.fresh
+        )
+        try:
+            main_loop = asyncio.get_running_loop()
+            crew_instance.set_event_loop(main_loop)
 
-    # Send initial connected message
-    yield f"data: {json.dumps({'type': 'connected', 'session_id': session_id})}\n\n"
-    await asyncio.sleep(0)
+            # Send initial connected message
+            yield f"data: {json.dumps({'type': 'connected', 'session_id': session_id, 'request_id': request_id})}\n\n"
+            await asyncio.sleep(0)
 
-    mode = detect_intent(chat_message.message) if chat_message.mode == "auto" else chat_message.mode
-    messages = await get_session_messages(session_id)
+            mode = detect_intent(chat_message.message) if chat_message.mode == "auto" else chat_message.mode
+            messages = await get_session_messages(session_id)
+            crew_instance.defer_image = chat_message.defer_image and mode == "playlist"
 
-    yield f"data: {json.dumps({'type': 'mode', 'mode': mode})}\n\n"
-    await asyncio.sleep(0)
+            yield f"data: {json.dumps({'type': 'mode', 'mode': mode})}\n\n"
+            await asyncio.sleep(0)
 
-    update_queue = asyncio.Queue()
-    crew_instance.set_stream_queue(update_queue)
+            update_queue = asyncio.Queue()
+            crew_instance.set_stream_queue(update_queue)
     
-    # Track completion
-    crew_completed = asyncio.Event()
-    crew_result = {'result': None, 'error': None}
-
-    def run_crew():
-        """Run CrewAI in background thread and push updates to async queue."""
-        try:
+            # Track completion
+            crew_completed = asyncio.Event()
             crew_inputs = {
                 'subject': chat_message.message,
                 'date': datetime.now().strftime("%B %d, %Y")
             }
-
-            if mode == "playlist":
-                result = crew_instance.crew().kickoff(inputs=crew_inputs)
-            else:
-                chat_history = "\n".join(
-                    f"{msg['role'].title()}: {msg['content']}" 
-                    for msg in messages
-                )
-                chat_crew = crew_instance.chat_crew()
-                chat_task = crew_instance.create_chat_task(
-                    message=chat_message.message,
-                    session_id=session_id,
-                    chat_history=chat_history
-                )
-                chat_crew.tasks = [chat_task]
-                result = chat_crew.kickoff(inputs=crew_inputs)
-
-            crew_result['result'] = result
-            main_loop.call_soon_threadsafe(
-                update_queue.put_nowait, {'type': 'crew_done', 'result': result}
-            )
-
-        except Exception as e:
-            crew_result['error'] = str(e)
-            main_loop.call_soon_threadsafe(
-                update_queue.put_nowait, {'type': 'error', 'error': str(e)}
-            )
-        finally:
-            main_loop.call_soon_threadsafe(crew_completed.set)
-
-    # Start crew in background
-    executor_future = main_loop.run_in_executor(None, run_crew)
-
-    try:
-        # Stream updates
-        while True:
-            update = await update_queue.get()
-
-            if update['type'] == 'crew_done':
-                result = update['result']
-                response, images = extract_images_from_result(result)
-                
-                await store_message(session_id, "user", chat_message.message, mode)
-                await store_message(session_id, "llm", response, mode, images=images)
-
-                yield f"data: {json.dumps({'type': 'complete', 'response': response, 'images': images, 'session_id': session_id, 'timestamp': datetime.now().isoformat()})}\n\n"
+            prefetched = await consume_prefetch(chat_message, session_id, crew_inputs) if mode == "playlist" else None
+            maybe_prefetch(chat_message, session_id, mode)
+            saved = False
+            image_task = None  # Owns the crew instance once a deferred image is started
+
+            def run_crew():
+                """Run CrewAI in background thread and push updates to async queue."""
+                try:
+                    cancel_token.raise_if_cancelled()
+                    if mode == "playlist":
+                        if prefetched:
+                            crew_instance.use_research(prefetched["subject"], prefetched["research"])
+                        else:
+                            crew_instance.load_research(chat_message.message)
+                        result = crew_instance.crew().kickoff(inputs=crew_inputs)
+                    else:
+                        chat_history = "\n".join(
+                            f"{msg['role'].title()}: {msg['content']}" 
+                            for msg in messages
+                        )
+                        chat_crew = crew_instance.chat_crew()
+                        chat_task = crew_instance.create_chat_task(
+                            message=chat_message.message,
+                            session_id=session_id,
+                            chat_history=chat_history
+                        )
+                        chat_crew.tasks = [chat_task]
+                        result = chat_crew.kickoff(inputs=crew_inputs)
+
+                    crew_result['result'] = result
+                    crew_result['status'] = 'finished'
+                    main_loop.call_soon_threadsafe(
+                        update_queue.put_nowait, {'type': 'crew_done', 'result': result}
+                    )
+
+                except CrewCancelled:
+                    crew_result['status'] = 'cancelled'
+                    main_loop.call_soon_threadsafe(
+                        update_queue.put_nowait, {'type': 'cancelled', 'request_id': request_id}
+                    )
+                except Exception as e:
+                    crew_result['error'] = str(e)
+                    main_loop.call_soon_threadsafe(
+                        update_queue.put_nowait, {'type': 'error', 'error': str(e)}
+                    )
+                finally:
+                    main_loop.call_soon_threadsafe(crew_completed.set)
+
+            # Start crew in background
+            executor_future = main_loop.run_in_executor(crew_executor, _in_worker, run_crew)
+
+            # Stream updates
+            while True:
+                update = await update_queue.get()
+
+                if update['type'] == 'crew_done':
+                    finish_run(request_id, session_id)
+                    result = update['result']
+                    response, images = extract_images_from_result(result)
                 
-                crew_instance.set_stream_queue(None)
-                return
+                    await store_message(session_id, "user", chat_message.message, mode)
+                    await store_message(session_id, "llm", response, mode, images=images, request_id=request_id)
+                    saved = True
 
-            elif update['type'] == 'error':
-                yield f"data: {json.dumps(update)}\n\n"
-                crew_instance.set_stream_queue(None)
-                return
+                    if crew_instance.defer_image:
+                        await set_image_job(request_id, "pending")
+                        image_task = asyncio.create_task(
+                            run_deferred_image(crew_instance, crew_inputs, session_id, request_id)
+                        )
 
+                    yield f"data: {json.dumps({'type': 'complete', 'response': response, 'images': images, 'session_id': session_id, 'request_id': request_id, 'image_pending': image_task is not None, 'timestamp': datetime.now().isoformat()})}\n\n"
+                
+                    crew_instance.set_stream_queue(None)
+
+                    if image_task:
+                        # Shielded so a disconnect doesn't cancel the generation; it still lands in Redis
+                        deferred_images = await asyncio.shield(image_task)
+                        yield f"data: {json.dumps({'type': 'image', 'images': deferred_images, 'request_id': request_id})}\n\n"
+                    else:
+                        release_crew(crew_instance)
+                    return
+
+                elif update['type'] in ('error', 'cancelled'):
+                    finish_run(request_id, session_id, crew_result['status'])
+                    yield f"data: {json.dumps(update)}\n\n"
+                    crew_instance.set_stream_queue(None)
+                    release_crew(crew_instance)
+                    return
+
+                else:
+                    yield f"data: {json.dumps(update)}\n\n"
+                    await asyncio.sleep(0)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            if executor_future is None:
+                # Gone before the crew started; nothing to save
+                crew_result['status'] = 'cancelled'
+                release_crew(crew_instance)
+                raise
+            # Client disconnected - either cancel the run or save it in the background
+            if disconnect_policy == "cancel":
+                print(f"⚠️ Client disconnected, cancelling run {request_id}...")
+                cancel_token.cancel()
             else:
-                yield f"data: {json.dumps(update)}\n\n"
-                await asyncio.sleep(0)
-
-    except (asyncio.CancelledError, GeneratorExit):
-        # Client disconnected - create background task to save messages
-        print(f"⚠️ Client disconnected, creating background save task...")
+                print(f"⚠️ Client disconnected, creating background save task...")
         
-        async def save_on_disconnect():
-            try:
-                await crew_completed.wait()
+            async def save_on_disconnect():
+                handed_off = image_task is not None
+                try:
+                    await crew_completed.wait()
+                    finish_run(request_id, session_id, crew_result['status'])
                 
-                if crew_result['result'] and not crew_result['error']:
-                    result = crew_result['result']
-                    response, images = extract_images_from_result(result)
+                    if crew_result['result'] and not crew_result['error'] and not saved:
+                        result = crew_result['result']
+                        response, images = extract_images_from_result(result)
                     
-                    await store_message(session_id, "user", chat_message.message, mode)
-                    await store_message(session_id, "llm", response, mode, images=images)
-                    print(f"✅ Messages saved after disconnect")
-            except Exception as e:
-                print(f"❌ Error saving after disconnect: {e}")
-            finally:
-                crew_instance.set_stream_queue(None)
+                        await store_message(session_id, "user", chat_message.message, mode)
+                        await store_message(session_id, "llm", response, mode, images=images, request_id=request_id)
+                        print(f"✅ Messages saved after disconnect")
+
+                        if crew_instance.defer_image:
+                            handed_off = True
+                            crew_instance.set_stream_queue(None)
+                            await set_image_job(request_id, "pending")
+                            await run_deferred_image(crew_instance, crew_inputs, session_id, request_id)
+                except Exception as e:
+                    print(f"❌ Error saving after disconnect: {e}")
+                finally:
+                    if not handed_off:
+                        crew_instance.set_stream_queue(None)
+                        release_crew(crew_instance)
         
-        # Create task only on disconnect
-        asyncio.create_task(save_on_disconnect())
-        raise  # Re-raise to properly close the stream
+            # Create task only on disconnect; it finishes the run once the crew is done
+            asyncio.create_task(save_on_disconnect())
+            saving_in_background = True
+            raise  # Re-raise to properly close the stream
+        except Exception:
+            if executor_future is None:
+                release_crew(crew_instance)
+            raise
+    finally:
+        if not saving_in_background:
+            finish_run(request_id, session_id, crew_result['status'])
+
+async def run_batch_item(index: int, subject: str, batch: BatchPlaylistRequest, cancel_token: CancelToken, date: str) -> Dict[str, Any]:
+    """Run one playlist of a batch; failures are reported per item"""
+    crew_instance = None
+
+    def run_crew():
+        cancel_token.raise_if_cancelled()
+        crew_instance.load_research(subject)
+        return crew_instance.crew().kickoff(inputs={'subject': subject, 'date': date})
+
+    try:
+        crew_pool = await get_crew_pool()
+        crew_instance = crew_pool.acquire(
+            batch.spotify_user_token, defer_image=not batch.include_image, cancel_token=cancel_token
+        )
+        result = await run_in_crew_executor(run_crew)
+        response, images = extract_images_from_result(result)
+        metrics.incr("batch_items_ok")
+        return {'type': 'item', 'index': index, 'subject': subject, 'status': 'ok', 'response': response, 'images': images}
+    except CrewCancelled:
+        metrics.incr("batch_items_cancelled")
+        return {'type': 'item', 'index': index, 'subject': subject, 'status': 'cancelled'}
+    except Exception as e:
+        print(f"❌ Batch item {index} error: {str(e)}")
+        metrics.incr("batch_items_failed")
+        return {'type': 'item', 'index': index, 'subject': subject, 'status': 'error', 'error': str(e)}
+    finally:
+        release_crew(crew_instance)
+
+async def stream_batch(batch: BatchPlaylistRequest):
+    """Run a batch with bounded parallelism, yielding NDJSON lines as items finish"""
+    request_id = batch.request_id or str(uuid.uuid4())
+    cancel_token = start_run(request_id, request_id)
+    parallel = max(1, min(batch.max_parallel or BATCH_MAX_PARALLEL, BATCH_MAX_PARALLEL))
+    semaphore = asyncio.Semaphore(parallel)
+    date = datetime.now().strftime("%B %d, %Y")
+
+    async def bounded(index: int, subject: str):
+        async with semaphore:
+            if cancel_token.cancelled_locally:
+                return {'type': 'item', 'index': index, 'subject': subject, 'status': 'cancelled'}
+            return await run_batch_item(index, subject, batch, cancel_token, date)
+
+    counts = {'ok': 0, 'error': 0, 'cancelled': 0}
+    run_status = "failed"
+    try:
+        yield json.dumps({'type': 'batch', 'request_id': request_id, 'count': len(batch.subjects), 'parallel': parallel}) + "\n"
+        tasks = [asyncio.create_task(bounded(i, subject)) for i, subject in enumerate(batch.subjects)]
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            counts[item['status']] += 1
+            yield json.dumps(item) + "\n"
+        run_status = "cancelled" if counts['cancelled'] else "finished"
+        finish_run(request_id, request_id, run_status)
+        yield json.dumps({'type': 'done', 'request_id': request_id, **counts}) + "\n"
+    except (asyncio.CancelledError, GeneratorExit):
+        # Nobody is reading the results anymore; stop spending on the rest of the batch
+        print(f"⚠️ Batch client disconnected, cancelling {request_id}...")
+        cancel_token.cancel()
+        run_status = "cancelled"
+        raise
+    finally:
+        finish_run(request_id, request_id, run_status)
+
+@app.post("/api/playlists/batch")
+async def batch_playlists(batch: BatchPlaylistRequest):
+    """Generate playlists for many subjects, streaming NDJSON results as each one finishes"""
+    if not batch.subjects:
+        raise HTTPException(status_code=400, detail="No subjects given")
+    if len(batch.subjects) > BATCH_MAX_SUBJECTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_SUBJECTS} subjects per batch")
+    return StreamingResponse(stream_batch(batch), media_type="application/x-ndjson")
+
+@app.delete("/api/chat/{run_id}")
+async def cancel_chat(run_id: str):
+    """Cancel a running crew; run_id is the request_id of the /api/chat call"""
+    token = active_runs.get(run_id)
+    if token:
+        token.cancel()
+    elif await redis_client.exists(f"{RUN_PREFIX}{run_id}"):
+        # Running on another worker; its crew thread polls for this flag
+        await redis_client.set(f"{CANCEL_PREFIX}{run_id}", "1", ex=CANCEL_TTL)
+    metrics.incr("cancel_requests")
+    return {"message": "Cancellation requested", "run_id": run_id, "running_here": token is not None}
+
+@app.get("/metrics")
+async def get_metrics():
+    """Process metrics as JSON"""
+    snapshot = metrics.snapshot()
+    try:
+        snapshot["session_memory"] = await session_memory()
+    except Exception as e:
+        snapshot["session_memory"] = f"error: {e}"
+    return snapshot
 
 @app.get("/api/history/{session_id}", response_model=ConversationHistory)
 async def get_history(session_id: str):
@@ -410,17 +905,74 @@ async def get_history(session_id: str):
     messages = await get_session_messages(session_id)
     return ConversationHistory(messages=messages)
 
+@app.get("/api/images/{request_id}", response_model=ImageStatus)
+async def get_image_status(request_id: str):
+    """Poll the status of a deferred playlist image"""
+    job = await get_image_job(request_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown image request")
+    return ImageStatus(**job)
+
 @app.delete("/api/session/{session_id}")
 async def clear_session(session_id: str):
     """Clear a conversation session"""
     await delete_session(session_id)
     return {"message": "Session cleared"}
 
+@app.get("/files/images/{filename}")
+async def get_image(filename: str, request: Request, variant: Optional[str] = None):
+    """Serve a generated image, negotiating WebP/AVIF via the Accept header"""
+    if "/" in filename or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    found = negotiate_variant(
+        IMAGES_DIR, filename, request.headers.get("accept"), thumb=variant == "thumb"
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path, media_type = found
+    headers = {
+        "ETag": strong_etag(path),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Vary": "Accept",
+    }
+    await asyncio.to_thread(touch_access, path)
+
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+# Mount static files directory at /files to match URL structure.
+# Registered after the image route so negotiated image delivery takes precedence.
+app.mount("/files", StaticFiles(directory="./files"), name="files")
+
+async def image_janitor():
+    """Periodically evict least recently used images to stay under the disk quota"""
+    while True:
+        try:
+            await asyncio.to_thread(enforce_disk_quota, IMAGES_DIR)
+        except Exception as e:
+            print(f"❌ Image janitor error: {e}")
+        await asyncio.sleep(IMAGE_JANITOR_INTERVAL)
+
+@app.on_event("startup")
+async def start_image_janitor():
+    app.state.image_janitor = asyncio.create_task(image_janitor())
+
+@app.on_event("startup")
+async def warm_crew():
+    """Import the crew stack in the background so startup isn't blocked on it"""
+    if WARM_CREW_ON_STARTUP:
+        app.state.crew_warmup = asyncio.create_task(get_crew_pool())
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     keys = await redis_client.keys("*")
-    return {"status": "healthy", "active_sessions": len(keys)}
+    # Auxiliary keys (image jobs, cancellations, caches) are namespaced with a colon
+    sessions = [k for k in keys if ":" not in k]
+    return {"status": "healthy", "active_sessions": len(sessions), "crew_loaded": _crew_pool is not None}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,124 @@
+"""Redis-backed caches used from inside crew runs.
+
+Crews run in executor threads, so these helpers use the synchronous Redis
+client. Every helper degrades to a cache miss when Redis is unavailable.
+"""
+from typing import Optional, Dict, Any
+import hashlib, json, os, re, time
+
+import redis
+
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+RESEARCH_CACHE_TTL = int(os.getenv("RESEARCH_CACHE_TTL", str(30 * 24 * 3600)))
+# Subjects like "this week's top hits" go stale long before a movie's facts do
+RESEARCH_CACHE_TTL_RECENT = int(os.getenv("RESEARCH_CACHE_TTL_RECENT", str(6 * 3600)))
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", str(7 * 24 * 3600)))
+# Cached pages younger than this are served without contacting the origin
+SCRAPE_FRESH_SECONDS = int(os.getenv("SCRAPE_FRESH_SECONDS", "3600"))
+
+RESEARCH_PREFIX = "research:"
+SCRAPE_PREFIX = "scrape:"
+
+_client = None
+
+# Words that describe the request rather than identify the subject
+_SUBJECT_STOPWORDS = {
+    "a", "an", "the", "me", "my", "for", "of", "to", "about", "with", "on", "by",
+    "please", "can", "could", "you", "make", "create", "build", "generate", "give",
+    "playlist", "soundtrack", "list", "songs", "music", "podcasts", "podcast",
+    "inspired", "based", "movie", "film", "spotify",
+}
+
+# Words that make a subject time-relative, so its research depends on the current date
+_TIME_RELATIVE_WORDS = {
+    "today", "todays", "tonight", "yesterday", "tomorrow", "now", "current", "currently",
+    "latest", "newest", "new", "recent", "recently", "upcoming", "trending", "viral",
+    "week", "weeks", "weekend", "month", "months", "year", "years", "season",
+    "top", "hits", "chart", "charts", "billboard", "popular",
+}
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Shared synchronous Redis client for crew threads"""
+    global _client
+    if _client is None:
+        try:
+            _client = redis.Redis.from_url(
+                REDIS_URL, decode_responses=True, socket_timeout=1, socket_connect_timeout=1
+            )
+        except Exception as e:
+            print(f"Cache unavailable: {e}")
+            return None
+    return _client
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def normalize_subject(subject: str) -> str:
+    """Reduce a request to the identity of its subject, e.g. 'Make me a playlist for The Matrix (1999)' -> 'matrix 1999'"""
+    words = re.findall(r"[a-z0-9]+", (subject or "").lower())
+    return " ".join(w for w in words if w not in _SUBJECT_STOPWORDS)
+
+
+def research_ttl(subject: str) -> int:
+    """Cache lifetime for research on a subject: short for time-relative subjects"""
+    words = set(re.findall(r"[a-z0-9]+", (subject or "").lower()))
+    return RESEARCH_CACHE_TTL_RECENT if words & _TIME_RELATIVE_WORDS else RESEARCH_CACHE_TTL
+
+
+def get_research(subject: str) -> Optional[str]:
+    """Return cached research facts for a subject"""
+    identity = normalize_subject(subject)
+    client = get_redis()
+    if not identity or client is None:
+        return None
+    try:
+        return client.get(f"{RESEARCH_PREFIX}{_hash(identity)}")
+    except redis.RedisError as e:
+        print(f"Research cache read error: {e}")
+        return None
+
+
+def store_research(subject: str, facts: str):
+    """Cache research facts for a subject"""
+    identity = normalize_subject(subject)
+    client = get_redis()
+    if not identity or not facts or client is None:
+        return
+    try:
+        client.set(f"{RESEARCH_PREFIX}{_hash(identity)}", facts, ex=research_ttl(subject))
+    except redis.RedisError as e:
+        print(f"Research cache write error: {e}")
+
+
+def get_page(url: str) -> Optional[Dict[str, Any]]:
+    """Return a cached scrape entry: {'text', 'etag', 'last_modified', 'fetched_at'}"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.get(f"{SCRAPE_PREFIX}{_hash(url)}")
+        return json.loads(raw) if raw else None
+    except (redis.RedisError, ValueError) as e:
+        print(f"Scrape cache read error: {e}")
+        return None
+
+
+def store_page(url: str, text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+    """Cache scraped page text along with its validators"""
+    client = get_redis()
+    if client is None:
+        return
+    entry = {
+        "text": text,
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.time(),
+    }
+    try:
+        client.set(f"{SCRAPE_PREFIX}{_hash(url)}", json.dumps(entry), ex=SCRAPE_CACHE_TTL)
+    except redis.RedisError as e:
+        print(f"Scrape cache write error: {e}")
@@ -0,0 +1,69 @@
+"""Cooperative cancellation of crew runs.
+
+A CancelToken is bound to a ThePreview instance for one run and checked
+between tasks and on every agent step. Cancelling raises CrewCancelled in
+the crew thread at the next checkpoint; an in-flight LLM or tool call is
+allowed to return first.
+"""
+import threading, time
+
+from .cache import get_redis
+
+CANCEL_PREFIX = "cancel:"
+# Marks a run as live on some worker; only live runs get a cancel flag
+RUN_PREFIX = "run:"
+CANCEL_TTL = 3600
+# How often a run polls Redis for cancellations requested on another worker
+REMOTE_CHECK_INTERVAL = 1.0
+
+
+class CrewCancelled(BaseException):
+    """Raised inside a crew thread to abort the run.
+
+    Derives from BaseException (like asyncio.CancelledError) so crewai's
+    agent retry and error handling, which catch Exception, don't swallow it.
+    """
+
+
+class CancelToken:
+    def __init__(self, run_id: str, session_id: str = None):
+        self.run_id = run_id
+        self.session_id = session_id
+        self._event = threading.Event()
+        self._last_remote_check = 0.0
+
+    def cancel(self):
+        self._event.set()
+
+    def _remote_cancelled(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_remote_check < REMOTE_CHECK_INTERVAL:
+            return False
+        self._last_remote_check = now
+        client = get_redis()
+        if client is None:
+            return False
+        try:
+            return bool(client.exists(f"{CANCEL_PREFIX}{self.run_id}"))
+        except Exception:
+            return False
+
+    @property
+    def cancelled_locally(self) -> bool:
+        """The local flag only; never touches Redis, so it is safe on the event loop"""
+        return self._event.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Also polls Redis (blocking); call it from crew threads"""
+        if self._event.is_set():
+            return True
+        if self._remote_cancelled():
+            self._event.set()
+            return True
+        return False
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise CrewCancelled(self.run_id)
+
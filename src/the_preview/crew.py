@@ -7,15 +7,23 @@ from crewai.utilities import printer
 if hasattr(printer, '_COLOR_CODES'):
     printer._COLOR_CODES['orange'] = '\033[38;5;208m'
 
-from crewai.project import CrewBase, agent, crew, task, tool
-from crewai_tools import SerperDevTool, ScrapeWebsiteTool, WebsiteSearchTool
+from crewai.project import CrewBase, agent, task, tool
+from crewai_tools import SerperDevTool
 from .tools.spotify_tool import SpotifyTool
+from .tools.cached_scrape_tool import CachedScrapeWebsiteTool
 from .tools.image_gen_tool import OpenAIImageGenerationTool
 from .tools.spotify_preferences_tool import SpotifyTasteProfileTool, SpotifyUserDataToolInput
+from .tools.taste_rank_tool import TasteRankTool
+from .tools.knowledge_search_tool import KnowledgeSearchTool
+from .cache import get_research, store_research
+from .cancellation import CancelToken
+from .llm_cache import CachedLLM, LLM_CACHE_AGENTS
+from .run_log import run_log, task_output_file
 from typing import List
 from datetime import datetime
+from functools import lru_cache
 from pydantic import BaseModel, Field
-import os
+import copy, os, warnings, yaml
 
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
@@ -26,22 +34,115 @@ RPM = int(os.getenv("RPM"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 FILE_PATH = os.getenv("FILE_PATH")
 OUTBOUND_FILE_PATH = os.getenv("OUTBOUND_FILE_PATH")
+# Step results (tool output) are truncated in the run log
+STEP_LOG_CHARS = 2000
+# Agents given the knowledge/ search tool, e.g. "playlist_creator,chat_agent"
+KNOWLEDGE_AGENTS = {a.strip() for a in os.getenv("KNOWLEDGE_AGENTS", "").split(",") if a.strip()}
+# Appended to manager_task's expected output when the image is generated in the same crew
+IMAGE_REQUIREMENT = """**Image requirement:**
+- Add the image URL at the end of the response, in this exact format:
+<IMAGE:IMAGE_URL>
+- Do not include any description, dialog, or headers for the image.
+- Do not alter the image url at all, include it EXACTLY as received."""
 llm = LLM(
   model=os.getenv("MODEL"),
   max_tokens=int(os.getenv("TOKENS"))
 )
 
 
+# Stateless tools are built once per process and shared by every crew instance.
+# The taste profile tool holds the user's token, so it stays per instance.
+@lru_cache(maxsize=None)
+def serper_tool() -> SerperDevTool:
+    base_url = os.getenv("SERPER_BASE_URL")
+    return SerperDevTool(base_url=base_url) if base_url else SerperDevTool()
+
+@lru_cache(maxsize=None)
+def scrape_tool() -> CachedScrapeWebsiteTool:
+    return CachedScrapeWebsiteTool()
+
+@lru_cache(maxsize=None)
+def spotify_tool() -> SpotifyTool:
+    return SpotifyTool()
+
+@lru_cache(maxsize=None)
+def image_tool() -> OpenAIImageGenerationTool:
+    return OpenAIImageGenerationTool(OPENAI_API_KEY, FILE_PATH, OUTBOUND_FILE_PATH)
+
+
+@lru_cache(maxsize=None)
+def knowledge_search_tool() -> KnowledgeSearchTool:
+    return KnowledgeSearchTool()
+
+def knowledge_tools(agent_name: str) -> list:
+    return [knowledge_search_tool()] if agent_name in KNOWLEDGE_AGENTS else []
+
+
+@lru_cache(maxsize=None)
+def _parse_yaml(config_path: str):
+    with open(config_path, "r", encoding="utf-8") as file:
+        return yaml.safe_load(file)
+
+def load_yaml_once(config_path) -> dict:
+    """Parse agents.yaml/tasks.yaml once per process; CrewBase mutates configs, so hand out copies"""
+    return copy.deepcopy(_parse_yaml(str(config_path)))
+
+
 @CrewBase
 class ThePreview:
     """ThePreview crew with chat capability"""
 
-    def __init__(self, spotify_token):
+    def __init__(self, spotify_token, defer_image: bool = False):
         # Queue for streaming updates
         self.stream_queue = None
         self._event_loop = None
         self.spotify_token = spotify_token
+        # When set, the playlist crew skips image generation; run image_crew() afterwards
+        self.defer_image = defer_image
         self.end_task_names = {}
+        # Research facts for the subject, set by load_research() before crew()
+        self.research_subject = None
+        self.cached_research = None
+        self._taste_profile_tool = None
+        self._taste_rank_tool = None
+        self.cancel_token = None
+        # Per-agent cached LLMs for agents listed in LLM_CACHE_AGENTS
+        self._cached_llms = {}
+        # "Give me something different": skip the completion cache for this run
+        self.cache_bypass = False
+
+    def bind(self, spotify_token, defer_image: bool = False, cancel_token: CancelToken = None, fresh: bool = False):
+        """Bind per-request state to a (possibly pooled) instance"""
+        self.spotify_token = spotify_token
+        self.defer_image = defer_image
+        self.cancel_token = cancel_token
+        # Cached LLMs not created yet pick this up in llm_for()
+        self.cache_bypass = fresh
+        for cached_llm in self._cached_llms.values():
+            cached_llm.cache_bypass = fresh
+        self.research_subject = None
+        self.cached_research = None
+        self.stream_queue = None
+        self._event_loop = None
+        if self._taste_profile_tool is not None:
+            self._taste_profile_tool.set_user_token(spotify_token)
+        return self
+
+    def reset(self):
+        """Drop per-request state before returning the instance to the pool"""
+        return self.bind(None)
+
+    def llm_for(self, agent_name: str) -> LLM:
+        """The shared LLM, or a completion-cached one if the agent opted in"""
+        if agent_name not in LLM_CACHE_AGENTS:
+            return llm
+        if agent_name not in self._cached_llms:
+            self._cached_llms[agent_name] = CachedLLM(
+                model=llm.model, max_tokens=llm.max_tokens, scope=agent_name
+            )
+        cached_llm = self._cached_llms[agent_name]
+        cached_llm.cache_bypass = self.cache_bypass
+        return cached_llm
 
     def set_event_loop(self, loop):
         """Set the event loop for async usage (for streaming support)"""
@@ -61,32 +162,113 @@ class ThePreview:
             except:
                 pass
 
+    def set_cancel_token(self, token: CancelToken):
+        """Set the token checked between tasks and agent steps"""
+        self.cancel_token = token
+
+    def _check_cancelled(self):
+        """Abort the run (raises CrewCancelled) if it has been cancelled"""
+        if self.cancel_token:
+            self.cancel_token.raise_if_cancelled()
+
+    def _log(self, event: str, **fields):
+        """Structured run record, tagged with the run's session and run ID"""
+        run_log.emit({
+            "event": event,
+            "session_id": getattr(self.cancel_token, "session_id", None),
+            "run_id": getattr(self.cancel_token, "run_id", None),
+            **fields,
+        })
+
     def _task_callback(self, task_output):
         """Callback for task completion"""
+        self._log(
+            "task_complete",
+            task=getattr(task_output, 'name', None),
+            agent=getattr(task_output, 'agent', None),
+            output=getattr(task_output, 'raw', None),
+        )
+        self._check_cancelled()
         task_name = getattr(task_output, 'name', 'Unknown task')[:50]
         task_name = self.end_task_names.get(task_name, task_name)
         self._stream_update(f"{task_name}", "task_complete")
 
+    def load_research(self, subject: str):
+        """Look up cached research for the subject; on a hit crew() skips the web scrape"""
+        self.research_subject = subject
+        self.cached_research = get_research(subject)
+        return self.cached_research
+
+    def use_research(self, subject: str, research: str):
+        """Use research gathered earlier (e.g. speculatively) instead of running the web scrape"""
+        self.research_subject = subject
+        self.cached_research = research
+
+    def _inject_research(self, inputs):
+        """Provide cached research to spotify_scrape_task via the {research} placeholder"""
+        inputs = dict(inputs or {})
+        if self.cached_research:
+            inputs["research"] = f"Known research on the subject:\n{self.cached_research}"
+        else:
+            inputs.setdefault("research", "")
+        return inputs
+
+    def _inject_image_requirement(self, inputs):
+        """Ask the manager for the image URL only when the image task runs in this crew"""
+        inputs = dict(inputs or {})
+        if self.defer_image:
+            inputs["image_request"] = ""
+            inputs["image_requirement"] = "Do not include any image or image URL; the image is delivered separately."
+        else:
+            inputs["image_request"] = ", and 1 image url"
+            inputs["image_requirement"] = IMAGE_REQUIREMENT
+        return inputs
+
+    def _store_research(self, task_output):
+        """Callback for web_scrape_task: cache the research for future runs"""
+        if self.research_subject:
+            store_research(self.research_subject, str(task_output.raw))
+
     def _step_callback(self, step_output):
         """Callback for agent steps"""
+        self._log(
+            "step",
+            tool=getattr(step_output, 'tool', None),
+            tool_input=getattr(step_output, 'tool_input', None),
+            thought=getattr(step_output, 'thought', None),
+            result=str(getattr(step_output, 'result', None) or getattr(step_output, 'output', ''))[:STEP_LOG_CHARS],
+        )
+        self._check_cancelled()
         # print(f"Step output:")
         # if hasattr(step_output, 'tool') and step_output.tool:
         #     tool = step_output.tool
         #     self._stream_update(f"{tool}", "step")
         return
 
+    def taste_profile_tool(self) -> SpotifyTasteProfileTool:
+        if self._taste_profile_tool is None:
+            self._taste_profile_tool = SpotifyTasteProfileTool(self.spotify_token)
+        return self._taste_profile_tool
+
+    def taste_rank_tool(self) -> TasteRankTool:
+        # Shares the taste profile tool, so it follows the rebound user token
+        if self._taste_rank_tool is None:
+            self._taste_rank_tool = TasteRankTool(spotify_tool(), self.taste_profile_tool())
+        return self._taste_rank_tool
+
     @agent
     def researcher(self) -> Agent:
         return Agent(
             config=self.agents_config["researcher"],
             verbose=True,
             tools=[
-                SerperDevTool(),
-                ScrapeWebsiteTool(),
+                serper_tool(),
+                scrape_tool(),
+                *knowledge_tools("researcher"),
             ],
             max_iter=10,
             max_rpm=RPM,
-            llm=llm
+            llm=self.llm_for("researcher")
         )
 
     @agent
@@ -97,12 +279,14 @@ class ThePreview:
             tools=[
               # SerperDevTool(),
               # ScrapeWebsiteTool(),
-              SpotifyTool(), 
-              SpotifyTasteProfileTool(self.spotify_token)
+              spotify_tool(),
+              self.taste_profile_tool(),
+              self.taste_rank_tool(),
+              *knowledge_tools("playlist_creator"),
             ],
             max_iter=20,
             max_rpm=RPM,
-            llm=llm
+            llm=self.llm_for("playlist_creator")
         )
 
     @agent
@@ -110,10 +294,10 @@ class ThePreview:
         return Agent(
             config=self.agents_config["image_generator"],
             verbose=True,
-            tools=[OpenAIImageGenerationTool(OPENAI_API_KEY, FILE_PATH, OUTBOUND_FILE_PATH)],
+            tools=[image_tool(), *knowledge_tools("image_generator")],
             max_iter=5,
             max_rpm=RPM,
-            llm=llm
+            llm=self.llm_for("image_generator")
         )
 
     @agent
@@ -124,10 +308,11 @@ class ThePreview:
             goal="Engage in natural conversation while maintaining context from previous messages. Provide helpful responses and remember what was discussed. Never return direct search results, always filter the results to maintain a normal conversation.",
             backstory="You're a friendly and knowledgeable assistant who helps users with their questions while maintaining conversation context. You can discuss previous topics and build upon earlier conversations.",
             verbose=True,
+            tools=knowledge_tools("chat_agent"),
             max_iter=10,
             max_rpm=RPM,
             allow_delegation=True,
-            llm=llm
+            llm=self.llm_for("chat_agent")
         )
 
     @agent
@@ -139,29 +324,30 @@ class ThePreview:
             allow_delegation=False,
             max_iter=15,
             max_rpm=RPM,
-            llm=llm
+            llm=self.llm_for("manager")
         )
 
     @task
     def web_scrape_task(self) -> Task:
         return Task(
             config=self.tasks_config["web_scrape_task"],
-            output_file="logs/web_scrape.md",
+            output_file=task_output_file("logs/web_scrape.md"),
             markdown=True,
+            callback=self._store_research,
         )
 
     @task
     def spotify_scrape_task(self) -> Task:
         return Task(
             config=self.tasks_config["spotify_scrape_task"],
-            output_file="logs/spotify_topic_scrape.md",
+            output_file=task_output_file("logs/spotify_topic_scrape.md"),
         )
 
     @task
     def generate_image_task(self) -> Task:
         return Task(
             config=self.tasks_config["generate_image_task"],
-            output_file="logs/generated_image.md",
+            output_file=task_output_file("logs/generated_image.md"),
             markdown=True,
         )
 
@@ -197,28 +383,65 @@ class ThePreview:
             markdown=True,
         )
 
-    @crew
     def crew(self) -> Crew:
-        """Creates the standard playlist/research crew"""
+        """Creates the standard playlist/research crew.
+
+        Not decorated with @crew: that memoizes per instance, and pooled
+        instances need a new task list (research, image) on every request.
+        Agents and tasks themselves stay memoized.
+        """
+
+        agents, tasks = [], []
+        # With cached research the web scrape is skipped; _inject_research passes the facts on
+        if not self.cached_research:
+            agents.append(self.researcher())
+            tasks.append(self.web_scrape_task())
+
+        agents.append(self.playlist_creator())
+        tasks.append(self.spotify_scrape_task())
+        if not self.defer_image:
+            agents.append(self.image_generator())
+            tasks.append(self.generate_image_task())
+        agents.append(self.manager())
+        tasks.append(self.manager_task())
 
+        # Progress messages announce the task that starts after each completed one
         self.end_task_names = {
-          "Searching the web": "Searching Spotify",
-          "Searching Spotify": "Generating an image",
-          "Generating an image": "Finalizing results"
+            tasks[i].name: tasks[i + 1].name for i in range(len(tasks) - 1)
         }
         return Crew(
-            agents=[
-              self.researcher(), self.playlist_creator(), self.image_generator(), self.manager()
-            ], 
-            tasks=[
-              self.web_scrape_task(), self.spotify_scrape_task(), self.generate_image_task(), self.manager_task()
-            ],
+            agents=agents,
+            tasks=tasks,
             process=Process.sequential, 
             verbose=True,
             task_callback=self._task_callback,
             step_callback=self._step_callback,
             max_rpm=RPM,
-            output_log_file="logs/playlist_crew.md"
+            output_log_file=task_output_file("logs/playlist_crew.md"),
+            before_kickoff_callbacks=[self._inject_research, self._inject_image_requirement],
+        )
+
+    def research_crew(self) -> Crew:
+        """Creates a crew that only runs the web research (used for speculative prefetch)"""
+        return Crew(
+            agents=[self.researcher()],
+            tasks=[self.web_scrape_task()],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=self._step_callback,
+            max_rpm=RPM,
+        )
+
+    def image_crew(self) -> Crew:
+        """Creates a crew that only generates the playlist image (used when the image is deferred)"""
+        return Crew(
+            agents=[self.image_generator()],
+            tasks=[self.generate_image_task()],
+            process=Process.sequential,
+            verbose=True,
+            step_callback=self._step_callback,
+            max_rpm=RPM,
+            output_log_file=task_output_file("logs/image_crew.md"),
         )
 
     def chat_crew(self) -> Crew:
@@ -230,5 +453,16 @@ class ThePreview:
             verbose=True,
             step_callback=self._step_callback,
             max_rpm=RPM,
-            output_log_file="logs/chat_crew.md",
-        )
\ No newline at end of file
+            output_log_file=task_output_file("logs/chat_crew.md"),
+        )
+
+
+# CrewBase re-reads the YAML configs on every instantiation; serve them from the parse cache
+if hasattr(ThePreview, "load_yaml"):
+    ThePreview.load_yaml = staticmethod(load_yaml_once)
+else:
+    warnings.warn(
+        "crewai's CrewBase no longer exposes load_yaml; agents.yaml/tasks.yaml will be "
+        "re-parsed for every crew instance",
+        RuntimeWarning,
+    )
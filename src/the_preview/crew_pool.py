@@ -0,0 +1,64 @@
+"""Process-wide pool of ThePreview instances.
+
+Building a ThePreview wires up every agent (with its RPM controller and
+tools) and task. Instances are reused across requests; only per-request
+state (Spotify user token, stream queue, deferred-image flag, research,
+cancel token, LLM cache bypass) is rebound on checkout. An instance is used by one request
+at a time.
+"""
+from contextlib import contextmanager
+from typing import Optional
+import os, threading
+
+from .crew import ThePreview
+from .cancellation import CancelToken
+
+
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "8"))
+
+
+class CrewPool:
+    """Thread-safe pool of idle ThePreview instances"""
+
+    def __init__(self, max_idle: int = CREW_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, spotify_token: Optional[str] = None, defer_image: bool = False, cancel_token: Optional[CancelToken] = None, fresh: bool = False) -> ThePreview:
+        """Check out an instance bound to this request's state"""
+        with self._lock:
+            instance = self._idle.pop() if self._idle else None
+            if instance is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if instance is None:
+            instance = ThePreview(spotify_token, defer_image=defer_image)
+        return instance.bind(spotify_token, defer_image=defer_image, cancel_token=cancel_token, fresh=fresh)
+
+    def release(self, instance: Optional[ThePreview]):
+        """Return an instance once nothing (including deferred work) is using it"""
+        if instance is None:
+            return
+        instance.reset()
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(instance)
+
+    @contextmanager
+    def checkout(self, spotify_token: Optional[str] = None, defer_image: bool = False, cancel_token: Optional[CancelToken] = None, fresh: bool = False):
+        instance = self.acquire(spotify_token, defer_image, cancel_token, fresh)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "created": self.created, "reused": self.reused}
+
+
+crew_pool = CrewPool()
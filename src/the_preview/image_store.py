@@ -0,0 +1,176 @@
+"""Variants, delivery helpers and disk-quota eviction for generated images.
+
+Images are content addressed (``<sha256>.png``) so every file, and every
+variant derived from it, is immutable and can be cached forever by clients.
+"""
+from typing import Optional, List, Tuple
+import io, os, time
+
+
+IMAGE_DISK_QUOTA_BYTES = int(float(os.getenv("IMAGE_DISK_QUOTA_MB", "1024")) * 1024 * 1024)
+IMAGE_JANITOR_INTERVAL = int(os.getenv("IMAGE_JANITOR_INTERVAL", "300"))
+THUMBNAIL_SIZE = (256, 256)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+
+def _load_pillow():
+    """Pillow is optional and only needed on the writer thread, so import it on first use"""
+    try:
+        from PIL import Image, features
+    except ImportError:  # without Pillow only the PNG is stored
+        return None, None
+    return Image, features
+
+
+def _avif_supported(features) -> bool:
+    try:
+        return bool(features and features.check("avif"))
+    except Exception:
+        return False
+
+
+def variant_filename(stem: str, ext: str, thumb: bool = False) -> str:
+    return f"{stem}.thumb.{ext}" if thumb else f"{stem}.{ext}"
+
+
+def write_variants(images_dir: str, stem: str, data: bytes) -> List[str]:
+    """Encode WebP/AVIF and thumbnail variants of a stored PNG. Returns written filenames."""
+    Image, features = _load_pillow()
+    if Image is None:
+        return []
+
+    written = []
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            thumb = img.copy()
+            thumb.thumbnail(THUMBNAIL_SIZE)
+
+            formats = [("webp", "WEBP", {"quality": 80, "method": 4})]
+            if _avif_supported(features):
+                formats.append(("avif", "AVIF", {"quality": 60}))
+
+            for ext, fmt, options in formats:
+                for source, is_thumb in ((img, False), (thumb, True)):
+                    filename = variant_filename(stem, ext, is_thumb)
+                    path = os.path.join(images_dir, filename)
+                    if os.path.exists(path):
+                        continue
+                    tmp_path = f"{path}.tmp"
+                    source.save(tmp_path, format=fmt, **options)
+                    os.replace(tmp_path, path)
+                    written.append(filename)
+
+            thumb_png = os.path.join(images_dir, variant_filename(stem, "png", True))
+            if not os.path.exists(thumb_png):
+                thumb.save(f"{thumb_png}.tmp", format="PNG", optimize=True)
+                os.replace(f"{thumb_png}.tmp", thumb_png)
+                written.append(os.path.basename(thumb_png))
+    except Exception as e:
+        print(f"Error writing image variants: {str(e)}")
+    return written
+
+
+def _accepted_types(accept_header: Optional[str]) -> dict:
+    """Parse an Accept header into {media type: q}"""
+    accepted = {}
+    for part in (accept_header or "").split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[fields[0].lower()] = q
+    return accepted
+
+
+def negotiate_variant(images_dir: str, filename: str, accept_header: Optional[str], thumb: bool = False) -> Optional[Tuple[str, str]]:
+    """Pick the smallest stored variant the client accepts.
+
+    Returns (path, media_type) or None if the image does not exist.
+    """
+    stem, _, ext = filename.partition(".")
+    if not stem or ext not in MEDIA_TYPES:
+        return None
+
+    accepted = _accepted_types(accept_header)
+    candidates = []
+    for candidate_ext in ("avif", "webp"):
+        media_type = MEDIA_TYPES[candidate_ext]
+        if accepted.get(media_type, 0) > 0 or candidate_ext == ext:
+            candidates.append(candidate_ext)
+    candidates.append(ext)
+
+    for candidate_ext in candidates:
+        path = os.path.join(images_dir, variant_filename(stem, candidate_ext, thumb))
+        if os.path.isfile(path):
+            return path, MEDIA_TYPES[candidate_ext]
+    if thumb:
+        return negotiate_variant(images_dir, filename, accept_header)
+    return None
+
+
+def strong_etag(path: str) -> str:
+    """Filenames are content hashes, so the name alone identifies the bytes"""
+    return f'"{os.path.basename(path)}"'
+
+
+def touch_access(path: str):
+    """Record an access for LRU eviction; atime is unreliable on noatime mounts"""
+    try:
+        stat = os.stat(path)
+        os.utime(path, (time.time(), stat.st_mtime))
+    except OSError:
+        pass
+
+
+def enforce_disk_quota(images_dir: str, quota_bytes: int = IMAGE_DISK_QUOTA_BYTES) -> int:
+    """Evict least recently accessed images (with all their variants) until under quota.
+
+    Returns the number of bytes freed.
+    """
+    groups = {}
+    total = 0
+    try:
+        entries = list(os.scandir(images_dir))
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        # Dotfiles are in-flight writes (mkstemp ".tmp-*"); deleting one breaks its os.replace
+        if (not entry.is_file() or entry.name.startswith(".")
+                or entry.name.endswith(".tmp") or entry.name.endswith(".json")):
+            continue
+        stat = entry.stat()
+        stem = entry.name.split(".", 1)[0]
+        size, last_access, paths = groups.get(stem, (0, 0.0, []))
+        paths.append(entry.path)
+        groups[stem] = (size + stat.st_size, max(last_access, stat.st_atime), paths)
+        total += stat.st_size
+
+    if total <= quota_bytes:
+        return 0
+
+    freed = 0
+    for stem, (size, _, paths) in sorted(groups.items(), key=lambda item: item[1][1]):
+        if total - freed <= quota_bytes:
+            break
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        freed += size
+    print(f"🧹 Image janitor freed {freed} bytes")
+    return freed
@@ -0,0 +1,102 @@
+"""Route chat messages to the playlist crew or the chat crew.
+
+All playlist phrases and patterns are compiled into a single regex that is
+matched once per message. Misrouting a chat turn starts the four-agent
+playlist crew, so messages the rules don't claim but that talk about music
+can optionally be passed to a tiny Naive Bayes classifier trained on
+config/intent_examples.yaml (INTENT_CLASSIFIER=1).
+"""
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+import math, os, re
+
+import yaml
+
+
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "false").lower() in ("1", "true", "yes")
+INTENT_EXAMPLES_PATH = Path(__file__).parent / "config" / "intent_examples.yaml"
+
+PLAYLIST_PHRASES = [
+    "create playlist", "make playlist", "create a playlist", "make a playlist",
+    "make me a playlist", "create for me a playlist", "create me a playlist",
+    "songs for", "music for", "podcasts for", "recommendations", "playlist for",
+    "playlist of", "playlist that", "playlist to", "playlist with",
+    "playlist including",
+]
+
+# One pass over the lowercased message: a phrase (or a leading "playlist") is a
+# playlist request, and so is a verb plus a list-like noun in either order. No pattern spans the gap
+# between them, so matching stays linear.
+PLAYLIST_PATTERN = re.compile(
+    r"(?P<phrase>^\s*playlist\b|" + "|".join(re.escape(phrase) for phrase in PLAYLIST_PHRASES) + ")"
+    r"|\b(?P<verb>make|create|build)\b"
+    r"|\b(?P<noun>list|soundtrack|playlist)\b"
+)
+
+# Messages that mention these but match no rule are ambiguous
+MUSIC_PATTERN = re.compile(
+    r"\b(?:songs?|music|tracks?|tunes|playlists?|soundtracks?|podcasts?|episodes?|mix|vibes?|listen(?:ing)?)\b",
+    re.IGNORECASE,
+)
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+
+def _features(text: str) -> List[str]:
+    words = _TOKEN.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """Multinomial Naive Bayes over word unigrams and bigrams"""
+
+    def __init__(self, examples: Dict[str, List[str]]):
+        self.labels = list(examples)
+        self.counts = {label: Counter(f for text in texts for f in _features(text)) for label, texts in examples.items()}
+        self.totals = {label: sum(c.values()) for label, c in self.counts.items()}
+        total_docs = sum(len(texts) for texts in examples.values())
+        self.priors = {label: math.log(len(texts) / total_docs) for label, texts in examples.items()}
+        self.vocab_size = len(set().union(*self.counts.values())) or 1
+
+    def predict(self, text: str) -> str:
+        features = _features(text)
+
+        def score(label):
+            counts, denominator = self.counts[label], self.totals[label] + self.vocab_size
+            return self.priors[label] + sum(math.log((counts[f] + 1) / denominator) for f in features)
+
+        return max(self.labels, key=score)
+
+
+@lru_cache(maxsize=1)
+def classifier() -> IntentClassifier:
+    with open(INTENT_EXAMPLES_PATH, "r", encoding="utf-8") as file:
+        return IntentClassifier(yaml.safe_load(file))
+
+
+def is_playlist_request(message: str) -> bool:
+    """Whether the playlist rules claim the message"""
+    seen = set()
+    for match in PLAYLIST_PATTERN.finditer(message.lower()):
+        group = match.lastgroup
+        if group == "phrase":
+            return True
+        seen.add(group)
+        if len(seen) == 2:
+            return True
+    return False
+
+
+def detect_intent(message: Optional[str], use_classifier: Optional[bool] = None) -> str:
+    """Detect if user wants a playlist or just wants to chat"""
+    if not message or not message.strip():
+        return "chat"
+    if is_playlist_request(message):
+        return "playlist"
+    if use_classifier is None:
+        use_classifier = INTENT_CLASSIFIER
+    if use_classifier and MUSIC_PATTERN.search(message):
+        return classifier().predict(message)
+    return "chat"
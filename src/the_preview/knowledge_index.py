@@ -0,0 +1,194 @@
+"""Persistent, incremental embedding index for the knowledge/ directory.
+
+Chunks are keyed by the content hash of their file and their own text, so
+a rebuild only embeds chunks that changed. Vectors live in a single .npy
+file that readers memory-map read-only; every worker process shares the
+same page-cache copy instead of holding its own embeddings. Rebuilds write
+a new file and atomically swap it in, so readers never see a partial index.
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+import fcntl, hashlib, json, os, threading
+
+import numpy as np
+
+
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "./knowledge")
+# Not under ./files, which is served publicly: the manifest holds the chunk text
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR", "./data/knowledge_index")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+CHUNK_SIZE = int(os.getenv("KNOWLEDGE_CHUNK_SIZE", "4000"))
+CHUNK_OVERLAP = int(os.getenv("KNOWLEDGE_CHUNK_OVERLAP", "200"))
+
+VECTORS_FILENAME = "vectors.npy"
+MANIFEST_FILENAME = "manifest.json"
+LOCK_FILENAME = ".lock"
+
+Embedder = Callable[[List[str]], List[List[float]]]
+
+
+def openai_embedder(texts: List[str]) -> List[List[float]]:
+    """Embed with the OpenAI API; imported lazily so the index loads without the client"""
+    from openai import OpenAI
+
+    response = OpenAI().embeddings.create(model=EMBEDDING_MODEL, input=texts)
+    return [d.embedding for d in response.data]
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    step = max(size - overlap, 1)
+    return [text[i:i + size] for i in range(0, max(len(text), 1), step) if text[i:i + size].strip()]
+
+
+class KnowledgeIndex:
+    """Embedding index over a directory, rebuilt incrementally and read via mmap"""
+
+    def __init__(self, source_dir: str = KNOWLEDGE_DIR, index_dir: str = KNOWLEDGE_INDEX_DIR,
+                 embedder: Embedder = openai_embedder, model: str = EMBEDDING_MODEL):
+        self.source_dir = Path(source_dir)
+        self.index_dir = Path(index_dir)
+        self.embedder = embedder
+        self.model = model
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._manifest: Optional[dict] = None
+        self._loaded_mtime = None
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.index_dir / VECTORS_FILENAME
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.index_dir / MANIFEST_FILENAME
+
+    def _read_manifest(self) -> dict:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"model": self.model, "files": {}, "chunks": []}
+        if manifest.get("model") != self.model:
+            # Vectors from another model are not comparable; start over
+            return {"model": self.model, "files": {}, "chunks": []}
+        return manifest
+
+    def _source_files(self) -> List[Path]:
+        if not self.source_dir.is_dir():
+            return []
+        return sorted(p for p in self.source_dir.rglob("*") if p.is_file() and not p.name.startswith("."))
+
+    def build(self) -> Dict[str, int]:
+        """Embed new or changed chunks and swap in the updated index.
+
+        Returns counts of reused and embedded chunks. A file lock keeps
+        concurrent workers from building at the same time.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.index_dir / LOCK_FILENAME, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                return self._build_locked()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _build_locked(self) -> Dict[str, int]:
+        old = self._read_manifest()
+        old_vectors = None
+        if old["chunks"] and self.vectors_path.exists():
+            old_vectors = np.load(self.vectors_path, mmap_mode="r")
+        old_rows = {c["hash"]: row for row, c in enumerate(old["chunks"])} if old_vectors is not None else {}
+
+        files, chunks = {}, []
+        for path in self._source_files():
+            data = path.read_bytes()
+            rel = str(path.relative_to(self.source_dir))
+            file_hash = _sha256(data)
+            files[rel] = file_hash
+            if old["files"].get(rel) == file_hash and old_vectors is not None:
+                chunks.extend(c for c in old["chunks"] if c["file"] == rel)
+                continue
+            text = data.decode("utf-8", errors="replace")
+            for index, chunk in enumerate(chunk_text(text)):
+                chunks.append({"file": rel, "index": index, "hash": _sha256(chunk.encode()), "text": chunk})
+
+        missing = [c for c in chunks if c["hash"] not in old_rows]
+        unchanged = files == old["files"] and not missing and len(chunks) == len(old["chunks"])
+        if unchanged:
+            return {"reused": len(chunks), "embedded": 0}
+
+        new_vectors = {}
+        if missing:
+            embedded = np.asarray(self.embedder([c["text"] for c in missing]), dtype=np.float32)
+            embedded /= np.maximum(np.linalg.norm(embedded, axis=1, keepdims=True), 1e-12)
+            new_vectors = {c["hash"]: v for c, v in zip(missing, embedded)}
+
+        rows = [new_vectors[c["hash"]] if c["hash"] in new_vectors else old_vectors[old_rows[c["hash"]]] for c in chunks]
+        matrix = np.stack(rows).astype(np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+
+        tmp_vectors = self.index_dir / f"{VECTORS_FILENAME}.tmp"
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, matrix)
+        tmp_manifest = self.index_dir / f"{MANIFEST_FILENAME}.tmp"
+        tmp_manifest.write_text(json.dumps({"model": self.model, "files": files, "chunks": chunks}), encoding="utf-8")
+        # Vectors first: a reader pairing the new vectors with the old manifest re-loads on the manifest swap
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_manifest, self.manifest_path)
+        return {"reused": len(chunks) - len(missing), "embedded": len(missing)}
+
+    def _load(self):
+        """Memory-map the current index, re-mapping if a rebuild swapped it"""
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None, None
+        with self._lock:
+            if self._loaded_mtime != mtime:
+                manifest = self._read_manifest()
+                vectors = np.load(self.vectors_path, mmap_mode="r") if manifest["chunks"] else None
+                if vectors is not None and len(vectors) != len(manifest["chunks"]):
+                    return self._vectors, self._manifest  # mid-swap; keep the previous mapping
+                self._vectors, self._manifest, self._loaded_mtime = vectors, manifest, mtime
+            return self._vectors, self._manifest
+
+    def search(self, query_vector: Sequence[float], k: int = 3) -> List[dict]:
+        vectors, manifest = self._load()
+        if vectors is None or not len(vectors):
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"source": manifest["chunks"][i]["file"], "text": manifest["chunks"][i]["text"], "score": round(float(scores[i]), 4)}
+            for i in top
+        ]
+
+    def query(self, text: str, k: int = 3) -> List[dict]:
+        return self.search(self._embed_query(text), k)
+
+    @lru_cache(maxsize=256)
+    def _embed_query(self, text: str):
+        return tuple(self.embedder([text])[0])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def knowledge_index() -> KnowledgeIndex:
+    """Process-wide index, built (incrementally) on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = KnowledgeIndex()
+            stats = index.build()
+            print(f"📚 Knowledge index ready: {stats['reused']} chunks reused, {stats['embedded']} embedded")
+            _index = index
+        return _index
@@ -0,0 +1,148 @@
+"""Opt-in completion cache for agent LLM calls.
+
+Enabled per agent with LLM_CACHE_AGENTS (comma separated agent names from
+crew.py, e.g. "researcher,image_generator,manager"). Completions are keyed
+by scope (agent), model, temperature and a hash of the message list, and
+stored in Redis and expire LLM_CACHE_TTL after their last use. Each scope
+is capped at LLM_CACHE_MAX_BYTES, tracked with a running byte counter;
+expired entries are pruned first, then the least recently used.
+"""
+from typing import Any, Optional
+import hashlib, json, os, time
+
+import redis
+from crewai import LLM
+
+from .cache import get_redis
+from .metrics import metrics
+
+
+LLM_CACHE_AGENTS = {a.strip() for a in os.getenv("LLM_CACHE_AGENTS", "").split(",") if a.strip()}
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+LLM_CACHE_PREFIX = "llmcache:"
+# Oldest entries fetched per round when evicting
+EVICT_BATCH = 50
+
+
+def completion_key(model: str, temperature: Optional[float], messages: Any) -> str:
+    """Deterministic cache key for a completion request; the scope is part of the Redis key"""
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _hit_rate(scope: str):
+    hits = metrics.get(f"llm_cache_{scope}_hits")
+    total = hits + metrics.get(f"llm_cache_{scope}_misses")
+    return round(hits / total, 4) if total else None
+
+
+class CachedLLM(LLM):
+    """LLM whose plain-text completions are served from Redis when possible"""
+
+    def __init__(self, *args, scope: str = "default", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_scope = scope
+        # Set per request for "give me something different"
+        self.cache_bypass = False
+        metrics.register_gauge(f"llm_cache_{scope}_hit_rate", lambda: _hit_rate(scope))
+
+    def _keys(self, digest: str):
+        """Entry key, LRU zset (scored by last use), per-entry sizes and the scope's byte total"""
+        base = f"{LLM_CACHE_PREFIX}{self.cache_scope}"
+        return f"{base}:{digest}", f"{base}:lru", f"{base}:sizes", f"{base}:bytes"
+
+    def _get(self, digest: str) -> Optional[str]:
+        client = get_redis()
+        if client is None:
+            return None
+        entry_key, lru_key, sizes_key, bytes_key = self._keys(digest)
+        try:
+            value = client.get(entry_key)
+            if value is not None:
+                # The entry's TTL follows its LRU score, so expired digests can be found by score
+                pipe = client.pipeline()
+                pipe.zadd(lru_key, {digest: time.time()})
+                # Slide the bookkeeping too, or hit-only traffic outlives the byte counter
+                for key in (entry_key, lru_key, sizes_key, bytes_key):
+                    pipe.expire(key, LLM_CACHE_TTL)
+                pipe.execute()
+            return value
+        except redis.RedisError as e:
+            print(f"LLM cache read error: {e}")
+            return None
+
+    def _put(self, digest: str, value: str):
+        client = get_redis()
+        if client is None:
+            return
+        entry_key, lru_key, sizes_key, bytes_key = self._keys(digest)
+        size = len(value.encode())
+        try:
+            previous = int(client.hget(sizes_key, digest) or 0)
+            pipe = client.pipeline()
+            pipe.set(entry_key, value, ex=LLM_CACHE_TTL)
+            pipe.zadd(lru_key, {digest: time.time()})
+            pipe.hset(sizes_key, digest, size)
+            pipe.incrby(bytes_key, size - previous)
+            # Bookkeeping outlives every entry by at most the TTL, then goes with them
+            for key in (lru_key, sizes_key, bytes_key):
+                pipe.expire(key, LLM_CACHE_TTL)
+            pipe.execute()
+            self._evict(client)
+        except redis.RedisError as e:
+            print(f"LLM cache write error: {e}")
+
+    def _drop(self, client, digests) -> int:
+        """Remove entries and their bookkeeping; returns the bytes freed"""
+        _, lru_key, sizes_key, bytes_key = self._keys("")
+        freed = sum(int(size or 0) for size in client.hmget(sizes_key, digests))
+        pipe = client.pipeline()
+        pipe.delete(*(self._keys(digest)[0] for digest in digests))
+        pipe.zrem(lru_key, *digests)
+        pipe.hdel(sizes_key, *digests)
+        pipe.decrby(bytes_key, freed)
+        pipe.execute()
+        return freed
+
+    def _evict(self, client):
+        """Prune expired entries, then drop least recently used ones until the scope is under its byte budget"""
+        _, lru_key, sizes_key, bytes_key = self._keys("")
+        expired = client.zrangebyscore(lru_key, "-inf", time.time() - LLM_CACHE_TTL)
+        if expired:
+            self._drop(client, expired)
+
+        total = int(client.get(bytes_key) or 0)
+        while total > LLM_CACHE_MAX_BYTES:
+            oldest = client.zrange(lru_key, 0, EVICT_BATCH - 1)
+            if not oldest:
+                break
+            victims, excess = [], total - LLM_CACHE_MAX_BYTES
+            for digest, size in zip(oldest, client.hmget(sizes_key, oldest)):
+                if excess <= 0:
+                    break
+                victims.append(digest)
+                excess -= int(size or 0)
+            total -= self._drop(client, victims)
+            metrics.incr(f"llm_cache_{self.cache_scope}_evictions", len(victims))
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        # Tool-calling requests depend on live function results; only cache plain completions
+        if self.cache_bypass or tools or available_functions:
+            return super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+
+        digest = completion_key(self.model, getattr(self, "temperature", None), messages)
+        cached = self._get(digest)
+        if cached is not None:
+            metrics.incr(f"llm_cache_{self.cache_scope}_hits")
+            return cached
+
+        metrics.incr(f"llm_cache_{self.cache_scope}_misses")
+        result = super().call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions, **kwargs)
+        if isinstance(result, str) and result:
+            self._put(digest, result)
+        return result
@@ -0,0 +1,40 @@
+"""Minimal in-process metrics: counters plus gauges computed on read.
+
+Exposed as JSON by the API's /metrics endpoint.
+"""
+from typing import Callable, Dict
+import threading
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, Callable[[], object]] = {}
+
+    def incr(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def register_gauge(self, name: str, fn: Callable[[], object]):
+        """Register a callable evaluated whenever metrics are read"""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        for name, fn in gauges.items():
+            try:
+                counters[name] = fn()
+            except Exception as e:
+                counters[name] = f"error: {e}"
+        return dict(sorted(counters.items()))
+
+
+metrics = Metrics()
@@ -0,0 +1,106 @@
+"""Speculative research for chat messages that will likely turn into playlists.
+
+When auto mode routes a message that names a movie to chat, the research
+step (and the user's taste profile) is fetched in the background while the
+chat answer is produced. The result is kept per session for a short time so
+a follow-up like "ok make me a playlist" starts with the research done.
+Speculative runs are capped in concurrency and per hour.
+"""
+from collections import deque
+from typing import Optional
+import os, re, threading, time
+
+from .cache import normalize_subject
+
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", "900"))
+PREFETCH_MAX_CONCURRENT = int(os.getenv("PREFETCH_MAX_CONCURRENT", "2"))
+PREFETCH_MAX_PER_HOUR = int(os.getenv("PREFETCH_MAX_PER_HOUR", "30"))
+PREFETCH_PREFIX = "prefetch:"
+
+# Words suggesting the message is about a movie or show
+_MOVIE_CUES = re.compile(
+    r"\b(?:movie|movies|film|films|watch|watched|watching|seen|directed|director|cast|starring|"
+    r"actor|actress|sequel|prequel|trailer|soundtrack|score|scene|series|show|episode)\b",
+    re.IGNORECASE,
+)
+_YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+# Quotes must open after whitespace so apostrophes ("don't ... what's") don't pair up
+_QUOTED = re.compile(r"(?:^|(?<=\s))[\"“'‘]([^\"”'’]{2,80})[\"”'’](?=\W|$)")
+# Title-cased runs, allowing numbers and lowercase joining words: "Lord of the Rings", "Blade Runner 2049"
+_TITLE_RUN = re.compile(
+    r"(?:[A-Z][\w'&:.-]*|\d+)(?:\s+(?:(?:of|the|and|in|on|a|an|to|for|at|vs\.?)\s+)*(?:[A-Z][\w'&:.-]*|\d+))*"
+)
+# What a follow-up says when the subject comes from the conversation
+_FOLLOW_UP_WORDS = {
+    "ok", "okay", "sure", "yes", "yeah", "now", "one", "it", "that", "this", "then", "so",
+    "do", "go", "ahead", "cool", "great", "nice", "let", "s", "lets", "and", "i", "want", "would", "like",
+}
+
+
+def likely_subject(message: str) -> Optional[str]:
+    """The movie a chat message seems to be about, if any"""
+    if not message:
+        return None
+    quoted = _QUOTED.search(message)
+    if quoted:
+        return quoted.group(1).strip()
+    if not (_MOVIE_CUES.search(message) or _YEAR.search(message)):
+        return None
+    candidates = [
+        m.group(0).rstrip(".:")
+        for m in _TITLE_RUN.finditer(message)
+        # A lone capitalized first word is usually just the start of the sentence
+        if m.start() > 0 or " " in m.group(0)
+    ]
+    candidates = [c for c in candidates if normalize_subject(c)]
+    return max(candidates, key=len) if candidates else None
+
+
+def is_follow_up(message: str) -> bool:
+    """Whether a playlist request leaves its subject to the conversation, e.g. 'ok make me a playlist'"""
+    words = set(normalize_subject(message).split())
+    return not (words - _FOLLOW_UP_WORDS)
+
+
+def mentions_subject(message: str, subject: str) -> bool:
+    """Whether a message names the subject as whole words, e.g. 'up' in 'a playlist for Up' but not 'upbeat'"""
+    wanted = normalize_subject(subject).split()
+    words = normalize_subject(message).split()
+    if not wanted:
+        return False
+    return any(words[i:i + len(wanted)] == wanted for i in range(len(words) - len(wanted) + 1))
+
+
+class SpeculationBudget:
+    """Caps concurrent speculative runs and how many start per hour"""
+
+    def __init__(self, max_concurrent: int = PREFETCH_MAX_CONCURRENT, max_per_hour: int = PREFETCH_MAX_PER_HOUR):
+        self.max_concurrent = max_concurrent
+        self.max_per_hour = max_per_hour
+        self._lock = threading.Lock()
+        self._running = 0
+        self._started = deque()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            while self._started and now - self._started[0] > 3600:
+                self._started.popleft()
+            if self._running >= self.max_concurrent or len(self._started) >= self.max_per_hour:
+                return False
+            self._running += 1
+            self._started.append(now)
+            return True
+
+    def release(self):
+        with self._lock:
+            self._running = max(self._running - 1, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"running": self._running, "started_last_hour": len(self._started)}
+
+
+speculation_budget = SpeculationBudget()
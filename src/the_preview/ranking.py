@@ -0,0 +1,171 @@
+"""Score candidate tracks against the user's taste profile in one NumPy batch.
+
+Each candidate becomes a compact feature vector (see FEATURES) and the
+whole batch is scored with a single matrix-vector product, so the
+playlist_creator gets a short pre-ranked list instead of raw search JSON.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+from .spotify_catalog import item_key, normalize
+
+
+FEATURES = ("artist_overlap", "genre_overlap", "popularity", "popularity_fit", "era_fit", "explicit_fit")
+FEATURE_WEIGHTS = np.array([0.35, 0.2, 0.1, 0.1, 0.15, 0.1])
+# Years between a track and the profile's typical release year at which era_fit falls to 1/e
+ERA_SCALE = 10.0
+
+
+def release_year(item: dict) -> Optional[int]:
+    date = item.get("release_year") or item.get("release_date") or ""
+    try:
+        return int(str(date)[:4])
+    except ValueError:
+        return None
+
+
+def _artist_names(item: dict) -> List[str]:
+    return [a.get("name", "") if isinstance(a, dict) else str(a) for a in item.get("artists") or []]
+
+
+@dataclass
+class TasteProfile:
+    """Weights derived from the user's top tracks and artists"""
+
+    artist_weights: Dict[str, float] = field(default_factory=dict)
+    genre_weights: Dict[str, float] = field(default_factory=dict)
+    popularity: float = 50.0
+    year: Optional[float] = None
+    explicit_ratio: float = 0.5
+    track_keys: set = field(default_factory=set)
+
+    @classmethod
+    def from_spotify(cls, top_tracks: Sequence[dict], top_artists: Sequence[dict]) -> "TasteProfile":
+        profile = cls()
+        # Higher ranked favourites weigh more; artists of top tracks count half
+        for rank, artist in enumerate(top_artists):
+            weight = 1.0 - rank / max(len(top_artists), 1)
+            name = normalize(artist.get("name"))
+            profile.artist_weights[name] = max(profile.artist_weights.get(name, 0.0), weight)
+            for genre in artist.get("genres") or []:
+                profile.genre_weights[genre] = profile.genre_weights.get(genre, 0.0) + weight
+        for rank, track in enumerate(top_tracks):
+            weight = 0.5 * (1.0 - rank / max(len(top_tracks), 1))
+            for name in map(normalize, _artist_names(track)):
+                profile.artist_weights[name] = max(profile.artist_weights.get(name, 0.0), weight)
+            profile.track_keys.add(item_key(track))
+
+        if profile.genre_weights:
+            top = max(profile.genre_weights.values())
+            profile.genre_weights = {g: w / top for g, w in profile.genre_weights.items()}
+
+        popularity = [t["popularity"] for t in list(top_tracks) + list(top_artists) if t.get("popularity") is not None]
+        if popularity:
+            profile.popularity = float(np.mean(popularity))
+        years = [y for y in map(release_year, top_tracks) if y]
+        if years:
+            profile.year = float(np.median(years))
+        if top_tracks:
+            profile.explicit_ratio = float(np.mean([bool(t.get("explicit")) for t in top_tracks]))
+        return profile
+
+
+def feature_matrix(profile: TasteProfile, candidates: Sequence[dict], artist_genres: Optional[Dict[str, List[str]]] = None) -> np.ndarray:
+    """(n_candidates, len(FEATURES)) matrix of features in [0, 1]"""
+    artist_genres = artist_genres or {}
+    n = len(candidates)
+    artists = list(profile.artist_weights)
+    genres = list(profile.genre_weights)
+    artist_index = {a: i for i, a in enumerate(artists)}
+    genre_index = {g: i for i, g in enumerate(genres)}
+
+    # (candidate row, profile column) pairs for every artist/genre match
+    artist_rows, artist_cols, genre_rows, genre_cols = [], [], [], []
+    popularity = np.full(n, np.nan)
+    years = np.full(n, np.nan)
+    explicit = np.zeros(n)
+
+    for row, item in enumerate(candidates):
+        for name in _artist_names(item):
+            key = normalize(name)
+            if key in artist_index:
+                artist_rows.append(row)
+                artist_cols.append(artist_index[key])
+            for genre in artist_genres.get(key, ()):
+                if genre in genre_index:
+                    genre_rows.append(row)
+                    genre_cols.append(genre_index[genre])
+        if item.get("popularity") is not None:
+            popularity[row] = item["popularity"]
+        year = release_year(item)
+        if year:
+            years[row] = year
+        explicit[row] = bool(item.get("explicit"))
+
+    artist_weights = np.array([profile.artist_weights[a] for a in artists] or [0.0])
+    genre_weights = np.array([profile.genre_weights[g] for g in genres] or [0.0])
+    artist_overlap = np.zeros(n)
+    np.maximum.at(artist_overlap, np.array(artist_rows, dtype=int), artist_weights[np.array(artist_cols, dtype=int)])
+    # A genre shared by several of a track's artists counts once
+    genre_pairs = np.unique(np.array([genre_rows, genre_cols], dtype=int), axis=1)
+    genre_overlap = np.zeros(n)
+    np.add.at(genre_overlap, genre_pairs[0], genre_weights[genre_pairs[1]])
+
+    popularity = np.nan_to_num(popularity, nan=profile.popularity)
+    features = np.empty((n, len(FEATURES)))
+    features[:, 0] = artist_overlap
+    features[:, 1] = np.minimum(genre_overlap, 1.0)
+    features[:, 2] = popularity / 100.0
+    features[:, 3] = 1.0 - np.abs(popularity - profile.popularity) / 100.0
+    if profile.year is None:
+        features[:, 4] = 0.5
+    else:
+        features[:, 4] = np.where(np.isnan(years), 0.5, np.exp(-np.abs(years - profile.year) / ERA_SCALE))
+    features[:, 5] = 1.0 - np.abs(explicit - profile.explicit_ratio)
+    return features
+
+
+def score_candidates(profile: TasteProfile, candidates: Sequence[dict], artist_genres: Optional[Dict[str, List[str]]] = None) -> np.ndarray:
+    if not candidates:
+        return np.zeros(0)
+    return feature_matrix(profile, candidates, artist_genres) @ FEATURE_WEIGHTS
+
+
+def shortlist(
+    profile: TasteProfile,
+    candidates: Sequence[dict],
+    limit: int = 10,
+    artist_genres: Optional[Dict[str, List[str]]] = None,
+    exclude_favourites: bool = True,
+) -> List[dict]:
+    """Best `limit` distinct candidates as compact entries for the agent"""
+    unique = {}
+    for item in candidates:
+        key = item_key(item)
+        if key in unique or (exclude_favourites and key in profile.track_keys):
+            continue
+        unique[key] = item
+    items = list(unique.values())
+    if not items:
+        return []
+
+    features = feature_matrix(profile, items, artist_genres)
+    scores = features @ FEATURE_WEIGHTS
+    order = np.argsort(-scores, kind="stable")[:limit]
+
+    result = []
+    for row in order:
+        item = items[row]
+        result.append({
+            "artists": _artist_names(item),
+            "name": item.get("name"),
+            "album_name": item.get("album_name"),
+            "release_year": release_year(item),
+            "popularity": item.get("popularity"),
+            "explicit": item.get("explicit"),
+            "spotify": (item.get("external_urls") or {}).get("spotify"),
+            "score": round(float(scores[row]), 3),
+            "features": {name: round(float(v), 2) for name, v in zip(FEATURES, features[row])},
+        })
+    return result
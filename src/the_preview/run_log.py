@@ -0,0 +1,120 @@
+"""Non-blocking, structured log of crew runs.
+
+Crew threads call ``run_log.emit(record)``, which only enqueues. A
+background thread batches records and appends them as JSON lines (each
+tagged with session and run ID) to RUN_LOG_DIR/runs.jsonl, rotating the
+file once it exceeds RUN_LOG_MAX_BYTES.
+
+The per-task markdown files (output_file / output_log_file) are shared by
+every run, so concurrent requests interleave them; they are kept for local
+development and can be disabled with TASK_OUTPUT_FILES=0.
+"""
+from typing import Optional
+import atexit, json, os, queue, threading, time
+
+from .metrics import metrics
+
+
+RUN_LOG_DIR = os.getenv("RUN_LOG_DIR", "./logs")
+RUN_LOG_FILENAME = "runs.jsonl"
+RUN_LOG_MAX_BYTES = int(os.getenv("RUN_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+RUN_LOG_BACKUPS = int(os.getenv("RUN_LOG_BACKUPS", "5"))
+RUN_LOG_BATCH_SIZE = 200
+RUN_LOG_FLUSH_INTERVAL = 0.5
+# Records beyond this are dropped rather than blocking a crew thread
+RUN_LOG_QUEUE_SIZE = 10000
+TASK_OUTPUT_FILES = os.getenv("TASK_OUTPUT_FILES", "1").lower() not in ("0", "false", "no")
+
+
+def task_output_file(path: str) -> Optional[str]:
+    """The markdown output path, or None when task output files are disabled"""
+    return path if TASK_OUTPUT_FILES else None
+
+
+class RunLogSink:
+    def __init__(self, directory: str = RUN_LOG_DIR, max_bytes: int = RUN_LOG_MAX_BYTES, backups: int = RUN_LOG_BACKUPS):
+        self.path = os.path.join(directory, RUN_LOG_FILENAME)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue = queue.Queue(maxsize=RUN_LOG_QUEUE_SIZE)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._thread = threading.Thread(target=self._writer, name="run-log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def emit(self, record: dict):
+        """Queue a record; never blocks the caller"""
+        self._ensure_started()
+        record.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("run_log_dropped")
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until queued records are written (used at exit)"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + RUN_LOG_FLUSH_INTERVAL
+            while len(batch) < RUN_LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                if isinstance(batch[-1], threading.Event):
+                    break
+
+            waiters = [r for r in batch if isinstance(r, threading.Event)]
+            records = [r for r in batch if not isinstance(r, threading.Event)]
+            if records:
+                self._write(records)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, records):
+        lines = "".join(json.dumps(r, default=str, ensure_ascii=False) + "\n" for r in records)
+        try:
+            self._rotate_if_needed()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            metrics.incr("run_log_records", len(records))
+        except OSError as e:
+            print(f"Run log write error: {e}")
+
+    def _rotate_if_needed(self):
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except FileNotFoundError:
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+run_log = RunLogSink()
@@ -0,0 +1,76 @@
+"""Compact, size-bounded encoding of session message lists stored in Redis.
+
+Messages are packed with msgpack and compressed with zstd once the packed
+payload exceeds SESSION_COMPRESS_THRESHOLD. Encoded payloads start with a
+marker byte that JSON text never does, so sessions written before the change
+still decode. Sessions are trimmed oldest-first to SESSION_MAX_MESSAGES
+messages and SESSION_MAX_BYTES packed bytes.
+"""
+from typing import Any, Dict, List, Optional, Tuple, Union
+import json, os, zlib
+
+import msgpack
+import zstandard
+
+
+SESSION_COMPRESS_THRESHOLD = int(os.getenv("SESSION_COMPRESS_THRESHOLD", "1024"))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "50"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024)))
+ZSTD_LEVEL = 3
+
+_MARKER = b"\xff"
+# Second and third header bytes: serializer and compressor. JSON and zlib are
+# no longer written but still decoded for payloads stored by older builds.
+_MSGPACK, _JSON = b"m", b"j"
+_ZSTD, _ZLIB, _RAW = b"z", b"d", b"-"
+
+# A compressor is not thread-safe; calls come from the event loop thread only
+_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def _pack(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def encode(messages: List[Dict[str, Any]]) -> bytes:
+    body = _pack(messages)
+    compressor = _RAW
+    if len(body) >= SESSION_COMPRESS_THRESHOLD:
+        body, compressor = _compressor.compress(body), _ZSTD
+    return _MARKER + _MSGPACK + compressor + body
+
+
+def decode(raw: Optional[Union[bytes, str]]) -> List[Dict[str, Any]]:
+    if not raw:
+        return []
+    if isinstance(raw, str) or not raw.startswith(_MARKER):
+        return json.loads(raw)  # written before sessions were encoded
+    serializer, compressor, body = raw[1:2], raw[2:3], raw[3:]
+    if compressor == _ZSTD:
+        body = _decompressor.decompress(body)
+    elif compressor == _ZLIB:
+        body = zlib.decompress(body)
+    if serializer == _MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+
+def trim(messages: List[Dict[str, Any]], max_messages: int = SESSION_MAX_MESSAGES, max_bytes: int = SESSION_MAX_BYTES) -> Tuple[List[Dict[str, Any]], int]:
+    """Drop the oldest messages over the caps; the newest message is always kept.
+
+    Returns (messages, number dropped).
+    """
+    keep = len(messages)
+    if max_messages > 0:
+        keep = min(keep, max_messages)
+    if max_bytes > 0:
+        total, count = 0, 0
+        for msg in reversed(messages[len(messages) - keep:]):
+            total += len(_pack(msg))
+            if total > max_bytes and count:
+                break
+            count += 1
+        keep = count
+    dropped = len(messages) - keep
+    return messages[dropped:], dropped
@@ -0,0 +1,243 @@
+"""Local on-disk index of Spotify items seen in search and taste-profile responses.
+
+Every item is stored in SQLite with a normalized artist/title key and an
+FTS5 index over its name and artists. SpotifyTool answers a search locally
+when the same query was seen recently, or when the query names a known item
+exactly (e.g. "Massive Attack Teardrop" while the agent verifies links), and
+only falls back to the API on misses or stale entries.
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import json, os, re, sqlite3, threading, time, unicodedata
+
+from .metrics import metrics
+
+
+# Not under ./files, which is served publicly
+SPOTIFY_CATALOG_PATH = os.getenv("SPOTIFY_CATALOG_PATH", "./data/spotify_catalog.db")
+# Entries older than this are stale and re-fetched from the API
+SPOTIFY_CATALOG_TTL = int(os.getenv("SPOTIFY_CATALOG_TTL", str(7 * 24 * 3600)))
+
+# "(feat. X)", "[Live]", "- 2011 Remaster", ... do not change which item is meant
+_DECORATIONS = re.compile(r"\([^)]*\)|\[[^\]]*\]|\s-\s.*$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    norm_key TEXT NOT NULL,
+    terms TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_type_key ON items (type, norm_key);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(id UNINDEXED, type UNINDEXED, terms);
+CREATE TABLE IF NOT EXISTS searches (
+    query_key TEXT PRIMARY KEY,
+    ids TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+@lru_cache(maxsize=8192)
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents, decorations and punctuation: 'Teardrop - 2018 Remaster' -> 'teardrop'"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    stripped = _DECORATIONS.sub(" ", text)
+    # Keep the original if the whole name was a decoration, e.g. "(What's the Story)"
+    text = stripped if stripped.strip() else text
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def _artist_names(item: Dict[str, Any]) -> List[str]:
+    if item.get("type") == "artist":
+        return [item.get("name") or ""]
+    names = [a.get("name", "") if isinstance(a, dict) else str(a) for a in item.get("artists") or []]
+    if not names:
+        names = item.get("album_artists") or [item.get("publisher") or item.get("show_name") or ""]
+    return names
+
+
+def item_key(item: Dict[str, Any]) -> str:
+    """Normalized 'primary artist|title' key"""
+    artists = _artist_names(item)
+    return f"{normalize(artists[0] if artists else '')}|{normalize(item.get('name'))}"
+
+
+class SpotifyCatalog:
+    """Thread-safe SQLite catalog; one connection per thread"""
+
+    def __init__(self, path: str = SPOTIFY_CATALOG_PATH, ttl: int = SPOTIFY_CATALOG_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.enabled = True
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+
+    def reopen(self, path: str):
+        """Switch to another database file; each thread reconnects on its next lookup"""
+        self.path = path
+        self.enabled = True
+        self._local = threading.local()
+
+    def _conn(self) -> Optional[sqlite3.Connection]:
+        if not self.enabled:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+            except sqlite3.Error as e:  # e.g. SQLite built without FTS5
+                print(f"Spotify catalog unavailable: {e}")
+                self.enabled = False
+                return None
+            self._local.conn = conn
+        return conn
+
+    def _record_lookup(self, started: float, hit: bool):
+        with self._stats_lock:
+            self._latencies.append(time.perf_counter() - started)
+        metrics.incr("spotify_catalog_hits" if hit else "spotify_catalog_misses")
+
+    @staticmethod
+    def _query_key(query: str, search_type: str, limit: int) -> str:
+        return f"{search_type}:{limit}:{normalize(query)}"
+
+    def _load(self, conn, ids: List[str], fresh_after: float) -> Optional[List[dict]]:
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        rows = dict(conn.execute(
+            f"SELECT id, payload FROM items WHERE id IN ({placeholders}) AND updated_at >= ?",
+            (*ids, fresh_after),
+        ).fetchall())
+        if len(rows) != len(set(ids)):
+            return None  # an item went stale
+        return [json.loads(rows[i]) for i in ids]
+
+    def search(self, query: str, search_type: str, limit: int) -> Optional[List[dict]]:
+        """Answer a search locally, or None if the API should be asked"""
+        conn = self._conn()
+        if conn is None:
+            return None
+        started = time.perf_counter()
+        fresh_after = time.time() - self.ttl
+        result = None
+        try:
+            row = conn.execute(
+                "SELECT ids, updated_at FROM searches WHERE query_key = ?",
+                (self._query_key(query, search_type, limit),),
+            ).fetchone()
+            if row and row[1] >= fresh_after:
+                result = self._load(conn, json.loads(row[0]), fresh_after)
+            if result is None:
+                result = self._known_items(conn, query, search_type, limit, fresh_after)
+        except sqlite3.Error as e:
+            print(f"Spotify catalog read error: {e}")
+            result = None
+        self._record_lookup(started, bool(result))
+        return result or None
+
+    def _known_items(self, conn, query: str, search_type: str, limit: int, fresh_after: float) -> List[dict]:
+        """Items whose artist and title words are exactly the query words"""
+        tokens = normalize(query).split()
+        if not tokens:
+            return []
+        match = " ".join(f'"{t}"' for t in tokens)
+        rows = conn.execute(
+            "SELECT i.payload, i.terms FROM items_fts f JOIN items i ON i.id = f.id "
+            "WHERE items_fts MATCH ? AND f.type = ? AND i.updated_at >= ? ORDER BY rank LIMIT ?",
+            (match, search_type, fresh_after, limit * 4),
+        ).fetchall()
+        wanted = set(tokens)
+        return [json.loads(payload) for payload, terms in rows if set(terms.split()) == wanted][:limit]
+
+    def add_items(self, items: List[dict], search_type: Optional[str] = None):
+        """Upsert item entries as returned by the Spotify tools"""
+        conn = self._conn()
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            with conn:
+                for item in items:
+                    if not isinstance(item, dict) or not item.get("id"):
+                        continue
+                    item_type = item.get("type") or search_type
+                    key = item_key(item)
+                    terms = " ".join(dict.fromkeys(key.replace("|", " ").split()))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO items (id, type, norm_key, terms, payload, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (item["id"], item_type, key, terms, json.dumps(item), now),
+                    )
+                    conn.execute("DELETE FROM items_fts WHERE id = ?", (item["id"],))
+                    conn.execute(
+                        "INSERT INTO items_fts (id, type, terms) VALUES (?, ?, ?)",
+                        (item["id"], item_type, terms),
+                    )
+        except sqlite3.Error as e:
+            print(f"Spotify catalog write error: {e}")
+
+    def record_search(self, query: str, search_type: str, limit: int, items: List[dict]):
+        """Index a search response and remember which items answered the query"""
+        self.add_items(items, search_type)
+        conn = self._conn()
+        if conn is None:
+            return
+        ids = [item["id"] for item in items if isinstance(item, dict) and item.get("id")]
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO searches (query_key, ids, updated_at) VALUES (?, ?, ?)",
+                    (self._query_key(query, search_type, limit), json.dumps(ids), time.time()),
+                )
+        except sqlite3.Error as e:
+            print(f"Spotify catalog write error: {e}")
+
+    def artist_genres(self, names: List[str]) -> Dict[str, List[str]]:
+        """Genres of known artists, keyed by normalized artist name"""
+        conn = self._conn()
+        keys = list(dict.fromkeys(f"{normalize(n)}|{normalize(n)}" for n in names if n))
+        if conn is None or not keys:
+            return {}
+        try:
+            rows = conn.execute(
+                f"SELECT norm_key, payload FROM items WHERE type = 'artist' AND norm_key IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Spotify catalog read error: {e}")
+            return {}
+        return {key.split("|", 1)[0]: json.loads(payload).get("genres") or [] for key, payload in rows}
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+        stats = {"enabled": self.enabled, "items": 0, "searches": 0, "bytes": 0}
+        if conn is not None:
+            try:
+                stats["items"] = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+                stats["searches"] = conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+                stats["bytes"] = sum(
+                    os.path.getsize(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p)
+                )
+            except (sqlite3.Error, OSError) as e:
+                print(f"Spotify catalog stats error: {e}")
+        if latencies:
+            stats["lookup_p50_ms"] = round(latencies[len(latencies) // 2] * 1000, 3)
+            stats["lookup_p99_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3)
+        return stats
+
+
+spotify_catalog = SpotifyCatalog()
+metrics.register_gauge("spotify_catalog", spotify_catalog.stats)
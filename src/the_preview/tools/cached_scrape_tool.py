@@ -0,0 +1,57 @@
+from crewai_tools import ScrapeWebsiteTool
+from typing import Any
+from bs4 import BeautifulSoup
+from ..cache import get_page, store_page, SCRAPE_FRESH_SECONDS
+import re, time, requests
+
+
+class CachedScrapeWebsiteTool(ScrapeWebsiteTool):
+    """ScrapeWebsiteTool that caches page text by URL and revalidates with ETag/Last-Modified"""
+
+    def _parse(self, page) -> str:
+        page.encoding = page.apparent_encoding
+        parsed = BeautifulSoup(page.text, "html.parser")
+
+        text = "The following text is scraped website content:\n\n"
+        text += parsed.get_text(" ")
+        text = re.sub("[ \t]+", " ", text)
+        text = re.sub("\\s+\n\\s+", "\n", text)
+        return text
+
+    def _run(self, **kwargs: Any) -> Any:
+        website_url = kwargs.get("website_url", self.website_url)
+        cached = get_page(website_url)
+
+        if cached and time.time() - cached["fetched_at"] < SCRAPE_FRESH_SECONDS:
+            return cached["text"]
+
+        headers = dict(self.headers or {})
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            page = requests.get(
+                website_url,
+                timeout=15,
+                headers=headers,
+                cookies=self.cookies if self.cookies else {},
+            )
+        except requests.RequestException:
+            if cached:
+                # Serve stale content rather than failing the research step
+                return cached["text"]
+            raise
+
+        if page.status_code == 304 and cached:
+            store_page(website_url, cached["text"], cached.get("etag"), cached.get("last_modified"))
+            return cached["text"]
+
+        text = self._parse(page)
+        if page.status_code == 200:
+            store_page(
+                website_url, text, page.headers.get("ETag"), page.headers.get("Last-Modified")
+            )
+        return text
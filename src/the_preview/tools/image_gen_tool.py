@@ -1,14 +1,79 @@
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Type, Optional
 from pydantic import BaseModel, Field
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 
 from openai import OpenAI
-import hashlib, base64, time, os, requests
+from ..image_store import write_variants
+import hashlib, base64, fcntl, json, tempfile, threading, os, re, requests
+
+
+# Single background writer so image and index writes never block the agent thread
+# and never race each other on disk.
+_IMAGE_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-writer")
+_INDEX_LOCK = threading.Lock()
+_PROMPT_INDEX = {}  # index path -> (mtime it was read at, {prompt key: filename})
+_PENDING_WRITES = set()  # full paths queued on the writer but not yet on disk
+
+# Kept outside ./files: that directory is served publicly and the index holds every prompt
+IMAGE_INDEX_PATH = os.getenv("IMAGE_INDEX_PATH", "./data/image_index.json")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different phrasings share a cache entry"""
+    return re.sub(r"\s+", " ", (prompt or "").strip().lower()).rstrip(".!")
+
+
+def prompt_key(prompt: str) -> str:
+    """Stable key for a normalized prompt"""
+    return hashlib.sha256(normalize_prompt(prompt).encode()).hexdigest()
+
+
+def content_hash(data: bytes) -> str:
+    """Content address for image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write to a unique temp file and rename so readers never see partial files"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_index(index_path: str) -> dict:
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge_index(index_path: str, entries: dict):
+    """Merge entries into the on-disk index under a file lock shared by every worker process"""
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    with open(f"{index_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            index = _read_index(index_path)
+            index.update(entries)
+            _write_atomic(index_path, json.dumps(index).encode())
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 
 class ImageGenerationInput(BaseModel):
     """Input schema for OpenAI Image Generation Tool."""
-    
+
     prompt: str = Field(..., description="Text description of the image to generate.")
 
 
@@ -29,31 +94,78 @@ class OpenAIImageGenerationTool(BaseTool):
         self.file_path = file_path
         self.outbound_file_path = outbound_file_path
 
-    def _generate_random_hash(self, prompt: str = "") -> str:
-        """Generate a random hash for filename"""
-        timestamp = str(int(time.time() * 1000))  # milliseconds
-        random_data = f"{timestamp}_{prompt}_{self.openai_api_key[:8]}"
-        return hashlib.md5(random_data.encode()).hexdigest()
+    @property
+    def images_dir(self) -> str:
+        return os.path.join(self.file_path, "images")
+
+    def _outbound_url(self, filename: str) -> str:
+        return os.path.join(self.outbound_file_path, "images", filename)
+
+    def _load_prompt_index(self) -> dict:
+        """The prompt index, re-read whenever another worker has rewritten it"""
+        index_path = IMAGE_INDEX_PATH
+        try:
+            mtime = os.stat(index_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with _INDEX_LOCK:
+            loaded_mtime, index = _PROMPT_INDEX.get(index_path, (None, None))
+            if index is None or (mtime is not None and mtime != loaded_mtime):
+                on_disk = _read_index(index_path)
+                # Keep entries whose write is still queued on this process's writer
+                index = {**on_disk, **(index or {})} if index else on_disk
+                _PROMPT_INDEX[index_path] = (mtime, index)
+            return index
+
+    def _lookup_cached_image(self, prompt: str) -> Optional[str]:
+        """Return the stored filename for a previously generated prompt, if still present"""
+        index = self._load_prompt_index()
+        with _INDEX_LOCK:
+            filename = index.get(prompt_key(prompt))
+            if not filename:
+                return None
+            image_path = os.path.join(self.images_dir, filename)
+            if image_path in _PENDING_WRITES or os.path.exists(image_path):
+                return filename
+            # File was removed from disk; forget the stale entry
+            index.pop(prompt_key(prompt), None)
+            return None
+
+    def _persist(self, image_path: str, data: Optional[bytes], key: str):
+        """Runs on the writer thread: store image bytes, variants and the prompt index entry"""
+        try:
+            os.makedirs(self.images_dir, exist_ok=True)
+            if data is not None and not os.path.exists(image_path):
+                _write_atomic(image_path, data)
+                stem = os.path.basename(image_path).split(".", 1)[0]
+                write_variants(self.images_dir, stem, data)
+            _merge_index(IMAGE_INDEX_PATH, {key: os.path.basename(image_path)})
+        except Exception as e:
+            print(f"Error writing image: {str(e)}")
+        finally:
+            with _INDEX_LOCK:
+                _PENDING_WRITES.discard(image_path)
 
     def _upload_base64_image(self, b64_data: str, prompt: str = "") -> str:
-        """Upload base64 image data and return the URL"""
-        
+        """Store base64 image data by content hash and return the URL"""
+
         try:
-            # Generate random filename
-            filename = f"{self._generate_random_hash(prompt)}.png"
-            
-            # Ensure the images directory exists
-            images_dir = os.path.join(self.file_path, "images")
-            os.makedirs(images_dir, exist_ok=True)
-            
-            image_path = os.path.join(images_dir, filename)
-            with open(image_path, "wb") as f:
-                f.write(base64.b64decode(b64_data))
-
-            outbound_file_path = os.path.join(self.outbound_file_path, "images", filename)
-
-            return outbound_file_path
-                
+            data = base64.b64decode(b64_data)
+            filename = f"{content_hash(data)}.png"
+            image_path = os.path.join(self.images_dir, filename)
+
+            key = prompt_key(prompt)
+            index = self._load_prompt_index()
+            with _INDEX_LOCK:
+                index[key] = filename
+                already_stored = image_path in _PENDING_WRITES or os.path.exists(image_path)
+                _PENDING_WRITES.add(image_path)
+
+            _IMAGE_WRITER.submit(
+                self._persist, image_path, None if already_stored else data, key
+            )
+            return self._outbound_url(filename)
+
         except Exception as e:
             # Return placeholder URL if upload fails
             print(f"Error uploading image: {str(e)}")
@@ -64,6 +176,10 @@ class OpenAIImageGenerationTool(BaseTool):
             if not self.file_path:
                 return "Error generating image"
 
+            cached = self._lookup_cached_image(prompt)
+            if cached:
+                return f"<IMAGE:{self._outbound_url(cached)}>"
+
             # Create client instance for each request
             client = OpenAI(api_key=self.openai_api_key)
             response = client.images.generate(
@@ -72,13 +188,13 @@ class OpenAIImageGenerationTool(BaseTool):
                 size="1024x1024",
                 quality="low",
             )
-            
+
             # Get base64 data from response
             b64_data = response.data[0].b64_json
 
             # Upload the image and get URL
             image_url = self._upload_base64_image(b64_data, prompt)
             return f"<IMAGE:{image_url}>" if image_url else "Error generating image"
-            
+
         except Exception as e:
             return f"Error generating image: {str(e)}"
@@ -0,0 +1,30 @@
+from crewai.tools import BaseTool
+from typing import Type
+from pydantic import BaseModel, Field
+from ..knowledge_index import knowledge_index
+
+
+class KnowledgeSearchToolInput(BaseModel):
+    query: str = Field(..., description="What to look up in the knowledge base.")
+    limit: int = Field(
+        default=3,
+        description="Number of passages to return (1-10), default 3.",
+        ge=1,
+        le=10,
+    )
+
+
+class KnowledgeSearchTool(BaseTool):
+    name: str = "Knowledge Search"
+    description: str = (
+        "Searches the local knowledge base (e.g. notes about the user's preferences) and returns the most relevant passages with their source file."
+    )
+    args_schema: Type[BaseModel] = KnowledgeSearchToolInput
+
+    def _run(self, query: str, limit: int = 3):
+        try:
+            results = knowledge_index().query(query, limit)
+            return results or "The knowledge base is empty."
+        except Exception as e:
+            print(f"Knowledge search error: {e}")
+            return f"Knowledge search error: {e}"
@@ -1,4 +1,7 @@
-import requests
+import os, requests
+
+
+SPOTIFY_ACCOUNTS_URL = os.getenv("SPOTIFY_ACCOUNTS_URL", "https://accounts.spotify.com")
 
 def get_spotify_token(client_id, client_secret):
     """
@@ -11,7 +14,7 @@ def get_spotify_token(client_id, client_secret):
     Returns:
         dict: Response from Spotify API containing access token
     """
-    url = "https://accounts.spotify.com/api/token"
+    url = f"{SPOTIFY_ACCOUNTS_URL}/api/token"
     
     headers = {
         "Content-Type": "application/x-www-form-urlencoded"
@@ -0,0 +1,256 @@
+"""Resilient GETs against the Spotify Web API.
+
+Transient failures are handled here instead of being handed to the agent
+as error strings:
+
+- 429: waits for Retry-After (shared by every thread, so concurrent runs
+  back off together) and retries, unless the wait exceeds
+  SPOTIFY_MAX_RETRY_AFTER.
+- 5xx and connection errors: retried with full-jitter exponential backoff.
+- Slow requests: a second identical GET is sent after SPOTIFY_HEDGE_AFTER
+  seconds and whichever answers first wins. At most SPOTIFY_MAX_HEDGES
+  calls are hedged at a time; the rest run unhedged on the caller's
+  thread, so a slow Spotify can't snowball into a saturated pool.
+- A circuit breaker opens after SPOTIFY_BREAKER_THRESHOLD consecutive
+  failed calls (a call that exhausts its retries counts once) and fails
+  fast for SPOTIFY_BREAKER_COOLDOWN seconds, including for retries and
+  hedges of calls already in flight.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from typing import Optional
+import os, random, threading, time, requests
+from requests.adapters import HTTPAdapter
+
+from ..metrics import metrics
+
+
+SPOTIFY_TIMEOUT = float(os.getenv("SPOTIFY_TIMEOUT", "10"))
+SPOTIFY_MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", "3"))
+SPOTIFY_BACKOFF_BASE = float(os.getenv("SPOTIFY_BACKOFF_BASE", "0.5"))
+SPOTIFY_BACKOFF_MAX = float(os.getenv("SPOTIFY_BACKOFF_MAX", "8"))
+SPOTIFY_MAX_RETRY_AFTER = float(os.getenv("SPOTIFY_MAX_RETRY_AFTER", "30"))
+# 0 disables hedging
+SPOTIFY_HEDGE_AFTER = float(os.getenv("SPOTIFY_HEDGE_AFTER", "1.5"))
+SPOTIFY_MAX_HEDGES = max(int(os.getenv("SPOTIFY_MAX_HEDGES", "4")), 1)
+SPOTIFY_BREAKER_THRESHOLD = int(os.getenv("SPOTIFY_BREAKER_THRESHOLD", "5"))
+SPOTIFY_BREAKER_COOLDOWN = float(os.getenv("SPOTIFY_BREAKER_COOLDOWN", "30"))
+
+
+class SpotifyUnavailable(Exception):
+    """Raised without contacting Spotify: the breaker is open or a long Retry-After is in effect"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after the cooldown lets one probe request through"""
+
+    def __init__(self, threshold: int = SPOTIFY_BREAKER_THRESHOLD, cooldown: float = SPOTIFY_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._probe_thread: Optional[int] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            self._probe_thread = threading.get_ident()
+            return True
+
+    def is_open(self) -> bool:
+        """True while cooling down; unlike allow() this never claims the probe"""
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.cooldown
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def abandon_probe(self):
+        """The calling thread's probe got no answer; let the next request probe instead"""
+        with self._lock:
+            if self._probe_thread == threading.get_ident():
+                self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    metrics.incr("spotify_circuit_opened")
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+breaker = CircuitBreaker()
+metrics.register_gauge("spotify_circuit_state", lambda: breaker.state)
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+# A hedged call holds a slot, i.e. two pool threads (primary and hedge), until both of its
+# requests finish, so hedged requests never queue behind each other
+_hedge_slots = threading.BoundedSemaphore(SPOTIFY_MAX_HEDGES)
+_hedge_pool = ThreadPoolExecutor(max_workers=2 * SPOTIFY_MAX_HEDGES, thread_name_prefix="spotify-hedge")
+
+# Process-wide: a 429 tells us the whole app is over the limit, not just one thread
+_rate_limited_until = 0.0
+_rate_limit_lock = threading.Lock()
+
+
+def _retry_after(response) -> float:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return 1.0
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return 1.0
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(SPOTIFY_BACKOFF_MAX, SPOTIFY_BACKOFF_BASE * 2 ** attempt))
+
+
+def _wait_for_rate_limit() -> bool:
+    """Sleep out a shared Retry-After window; False if it is too long to wait"""
+    delay = _rate_limited_until - time.monotonic()
+    if delay <= 0:
+        return True
+    if delay > SPOTIFY_MAX_RETRY_AFTER:
+        return False
+    time.sleep(delay)
+    return True
+
+
+def _send(url: str, headers: dict, params: Optional[dict]):
+    return _session.get(url, headers=headers, params=params, timeout=SPOTIFY_TIMEOUT)
+
+
+def _release_slot_after(*futures):
+    """Free the call's hedge slot once all of its requests have finished, the loser included"""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            _hedge_slots.release()
+
+    for future in futures:
+        future.add_done_callback(done)
+
+
+def _hedged_get(url: str, headers: dict, params: Optional[dict]):
+    if SPOTIFY_HEDGE_AFTER <= 0:
+        return _send(url, headers, params)
+    if not _hedge_slots.acquire(blocking=False):
+        metrics.incr("spotify_hedge_capacity_full")
+        return _send(url, headers, params)
+
+    # The slot guarantees a free pool thread. The primary can't run on this thread,
+    # because a thread blocked in it couldn't pick up a faster hedge.
+    primary = _hedge_pool.submit(_send, url, headers, params)
+    done, _ = wait([primary], timeout=SPOTIFY_HEDGE_AFTER)
+    if done or breaker.is_open():
+        # Answered in time, or another call opened the breaker meanwhile and a hedge would only add load
+        _release_slot_after(primary)
+        return primary.result()
+
+    metrics.incr("spotify_hedges")
+    hedge = _hedge_pool.submit(_send, url, headers, params)
+    _release_slot_after(primary, hedge)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    metrics.incr("spotify_hedge_wins")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def spotify_get(url: str, headers: dict, params: Optional[dict] = None):
+    """GET with retries, Retry-After handling, hedging and a circuit breaker.
+
+    Returns the final response (which may still be an error status) or raises
+    SpotifyUnavailable / requests.RequestException.
+    """
+    if not breaker.allow():
+        metrics.incr("spotify_circuit_rejected")
+        raise SpotifyUnavailable("Spotify is temporarily unavailable, try again later")
+    try:
+        return _get_with_retries(url, headers, params)
+    except BaseException:
+        # Outcomes are recorded inside; if anything else escaped, a probe from this
+        # thread must not leave the breaker half-open (and rejecting) forever
+        breaker.abandon_probe()
+        raise
+
+
+def _get_with_retries(url: str, headers: dict, params: Optional[dict]):
+    global _rate_limited_until
+    # The breaker counts logical calls: a call that exhausts its retries is one failure
+    for attempt in range(SPOTIFY_MAX_RETRIES + 1):
+        last_attempt = attempt == SPOTIFY_MAX_RETRIES
+        if attempt and breaker.is_open():
+            metrics.incr("spotify_circuit_rejected")
+            raise SpotifyUnavailable("Spotify is temporarily unavailable, try again later")
+        if not _wait_for_rate_limit():
+            raise SpotifyUnavailable("Spotify rate limit in effect, try again later")
+        metrics.incr("spotify_requests")
+        try:
+            response = _hedged_get(url, headers, params)
+        except requests.RequestException:
+            if last_attempt:
+                breaker.record_failure()
+                raise
+            metrics.incr("spotify_retries")
+            time.sleep(_backoff(attempt))
+            continue
+
+        if response.status_code == 429:
+            # Spotify answered, so it is up; the shared Retry-After window handles the limit
+            breaker.record_success()
+            metrics.incr("spotify_rate_limited")
+            delay = _retry_after(response)
+            with _rate_limit_lock:
+                _rate_limited_until = max(_rate_limited_until, time.monotonic() + delay)
+            if last_attempt or delay > SPOTIFY_MAX_RETRY_AFTER:
+                return response
+            metrics.incr("spotify_retries")
+            continue
+
+        if response.status_code >= 500:
+            if last_attempt:
+                breaker.record_failure()
+                return response
+            metrics.incr("spotify_retries")
+            time.sleep(_backoff(attempt))
+            continue
+
+        breaker.record_success()
+        return response
@@ -2,7 +2,19 @@ from crewai.tools import BaseTool
 from typing import Type, Optional
 from pydantic import BaseModel, Field, ConfigDict, PrivateAttr
 from enum import Enum
-import requests
+from ..spotify_catalog import spotify_catalog
+from .spotify_client import spotify_get
+import hashlib, os, threading, time
+
+
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+# Taste profiles barely change within minutes; share them across concurrent runs
+# (e.g. a batch of playlists) for the same user.
+TASTE_PROFILE_TTL = int(os.getenv("TASTE_PROFILE_TTL", "600"))
+
+_profile_cache = {}  # key -> (expires_at, result)
+_profile_locks = {}  # key -> lock, so concurrent runs fetch each profile once
+_profile_lock = threading.Lock()
 
 
 class SpotifyUserDataType(str, Enum):
@@ -59,9 +71,13 @@ class SpotifyTasteProfileTool(BaseTool):
         """Property to access the stored token"""
         return self.__dict__.get('_user_token')
 
+    def set_user_token(self, spotify_token):
+        """Rebind the token when the tool is reused for another request"""
+        self.__dict__['_user_token'] = spotify_token
+
     def _get_top_items(self, item_type: str, time_range: str, limit: int):
         """Fetch user's top tracks or artists."""
-        url = f"https://api.spotify.com/v1/me/top/{item_type}"
+        url = f"{SPOTIFY_API_URL}/me/top/{item_type}"
         headers = {"Authorization": f"Bearer {self.user_token}"}
         params = {
             "time_range": time_range,
@@ -69,7 +85,7 @@ class SpotifyTasteProfileTool(BaseTool):
             "offset": 0,
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = spotify_get(url, headers=headers, params=params)
         if response.status_code != 200:
             return f"Spotify API error: {response.status_code}, {response.text}, User token: {self.user_token}"
 
@@ -87,6 +103,8 @@ class SpotifyTasteProfileTool(BaseTool):
             if "album" in item and item_type == "tracks":
                 entry["album_name"] = item["album"].get("name")
                 entry["album_artists"] = [a["name"] for a in item["album"].get("artists", [])]
+                if item["album"].get("release_date"):
+                    entry["release_year"] = item["album"]["release_date"][:4]
                 
             result.append(entry)
 
@@ -94,14 +112,14 @@ class SpotifyTasteProfileTool(BaseTool):
 
     def _get_saved_items(self, item_type: str, limit: int):
         """Fetch user's saved shows or episodes."""
-        url = f"https://api.spotify.com/v1/me/{item_type}"
+        url = f"{SPOTIFY_API_URL}/me/{item_type}"
         headers = {"Authorization": f"Bearer {self.user_token}"}
         params = {
             "limit": limit,
             "offset": 0,
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = spotify_get(url, headers=headers, params=params)
         if response.status_code != 200:
             return f"Spotify API error: {response.status_code}, {response.text}, User token: {self.user_token}"
 
@@ -130,7 +148,33 @@ class SpotifyTasteProfileTool(BaseTool):
 
         return result
 
+    def _cache_key(self, data_type: str, time_range: str, limit: int) -> str:
+        token_hash = hashlib.sha256((self.user_token or "").encode()).hexdigest()
+        return f"{token_hash}:{data_type}:{time_range}:{limit}"
+
     def _run(self, data_type: str, time_range: str = "medium_term", limit: int = 10) -> str:
+        if not self.user_token:
+            return self._fetch(data_type, time_range, limit)
+
+        key = self._cache_key(data_type, time_range, limit)
+        with _profile_lock:
+            lock = _profile_locks.setdefault(key, threading.Lock())
+        with lock:
+            cached = _profile_cache.get(key)
+            if cached and cached[0] > time.time():
+                return cached[1]
+            result = self._fetch(data_type, time_range, limit)
+            # Only successful responses are lists; errors come back as strings
+            if isinstance(result, list):
+                spotify_catalog.add_items(result)
+                with _profile_lock:
+                    _profile_cache[key] = (time.time() + TASTE_PROFILE_TTL, result)
+                    for stale in [k for k, (exp, _) in _profile_cache.items() if exp <= time.time()]:
+                        _profile_cache.pop(stale, None)
+                        _profile_locks.pop(stale, None)
+            return result
+
+    def _fetch(self, data_type: str, time_range: str = "medium_term", limit: int = 10):
         try:
             if data_type == "top_tracks":
                 return self._get_top_items("tracks", time_range, limit)
@@ -1,13 +1,16 @@
 from .spotify_auth import get_spotify_token
+from ..spotify_catalog import spotify_catalog
+from .spotify_client import spotify_get
 from crewai.tools import BaseTool
 from typing import Type
 from pydantic import BaseModel, Field
 from enum import Enum
-import hashlib, base64, time, os, requests
+import hashlib, base64, time, os
 
 
 CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
 
 
 class SpotifySearchType(str, Enum):
@@ -67,13 +70,16 @@ class SpotifyTool(BaseTool):
 
     def _run(self, query: str, search_type: str, limit: int) -> str:
         try:
-            
+            local = spotify_catalog.search(query, search_type, limit)
+            if local is not None:
+                return local
+
             spotify_token = self._get_valid_token()
 
-            url = "https://api.spotify.com/v1/search"
+            url = f"{SPOTIFY_API_URL}/search"
             headers = {"Authorization": f"Bearer {spotify_token}"}
             params = {"q": query, "type": search_type, "limit": limit, "market": "US"}
-            response = requests.get(url, headers=headers, params=params)
+            response = spotify_get(url, headers=headers, params=params)
 
             if response.status_code != 200:
                 print("Spotify API error: reponse != 200", response)
@@ -107,6 +113,8 @@ class SpotifyTool(BaseTool):
                 if "album" in item:
                     entry["album_name"] = item["album"].get("name")
                     entry["album_artists"] = [a["name"] for a in item["album"].get("artists", [])]
+                    if item["album"].get("release_date"):
+                        entry["release_year"] = item["album"]["release_date"][:4]
 
                 # truncate description
                 if "description" in entry and entry["description"]:
@@ -114,6 +122,7 @@ class SpotifyTool(BaseTool):
                 
                 result.append(entry)
 
+            spotify_catalog.record_search(query, search_type, limit, result)
             return result
 
         except Exception as e:
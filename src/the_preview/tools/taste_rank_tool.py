@@ -0,0 +1,66 @@
+from crewai.tools import BaseTool
+from typing import List, Type
+from pydantic import BaseModel, Field
+from ..ranking import TasteProfile, shortlist
+from ..spotify_catalog import spotify_catalog
+
+
+# Candidates gathered per query before ranking
+CANDIDATES_PER_QUERY = 20
+MAX_QUERIES = 8
+
+
+class TasteRankToolInput(BaseModel):
+    queries: List[str] = Field(
+        ...,
+        description="Spotify track search queries to gather candidates from (e.g. moods, eras, themes or artists that fit the subject), at most 8.",
+    )
+    limit: int = Field(
+        default=10,
+        description="Number of ranked tracks to return (3-20), default 10.",
+        ge=3,
+        le=20,
+    )
+
+
+class TasteRankTool(BaseTool):
+    name: str = "Taste Ranked Track Search"
+    description: str = (
+        "Searches Spotify for tracks matching each query and returns a short list ranked against the user's taste profile "
+        "(artist overlap, genres, popularity, release era, explicitness). The user's favourite tracks are left out. "
+        "Each entry includes its Spotify link under the 'spotify' key and a score; higher scores fit the user better."
+    )
+    args_schema: Type[BaseModel] = TasteRankToolInput
+
+    def __init__(self, search_tool, taste_tool, **kwargs):
+        super().__init__(**kwargs)
+        self.__dict__['_search_tool'] = search_tool
+        self.__dict__['_taste_tool'] = taste_tool
+
+    def _profile(self) -> TasteProfile:
+        taste_tool = self.__dict__['_taste_tool']
+        top_tracks = taste_tool._run("top_tracks", "medium_term", 25)
+        top_artists = taste_tool._run("top_artists", "medium_term", 25)
+        # Errors come back as strings; rank without that part of the profile
+        return TasteProfile.from_spotify(
+            top_tracks if isinstance(top_tracks, list) else [],
+            top_artists if isinstance(top_artists, list) else [],
+        )
+
+    def _run(self, queries: List[str], limit: int = 10):
+        try:
+            search_tool = self.__dict__['_search_tool']
+            candidates = []
+            for query in queries[:MAX_QUERIES]:
+                result = search_tool._run(query, "track", CANDIDATES_PER_QUERY)
+                if isinstance(result, list):
+                    candidates.extend(result)
+            if not candidates:
+                return "No tracks found for the given queries."
+
+            artists = [a.get("name") for item in candidates for a in item.get("artists") or [] if isinstance(a, dict)]
+            return shortlist(self._profile(), candidates, limit, spotify_catalog.artist_genres(artists))
+
+        except Exception as e:
+            print(f"Taste ranking error: {e}")
+            return f"Taste ranking error: {e}"
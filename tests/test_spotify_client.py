@@ -0,0 +1,208 @@
+"""Breaker, retry and Retry-After behaviour of spotify_get, with the network faked out."""
+import threading, time
+
+import pytest
+import requests
+
+from the_preview.tools import spotify_client as sc
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSpotify:
+    """Stands in for _send: records each request and answers from a script or a handler"""
+
+    def __init__(self):
+        self.sent = []
+        self.threads = []
+        self.handler = lambda: FakeResponse(200)
+
+    def respond(self, *results):
+        """Answer (or raise) the given results in order; the last one repeats"""
+        def scripted():
+            outcome = results[min(len(self.sent), len(results)) - 1]
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return outcome
+        self.handler = scripted
+
+    def __call__(self, url, headers, params):
+        self.sent.append(url)
+        self.threads.append(threading.get_ident())
+        return self.handler()
+
+
+@pytest.fixture
+def spotify(monkeypatch):
+    """Fresh breaker and rate-limit window, no hedging, no real sleeps"""
+    monkeypatch.setattr(sc, "breaker", sc.CircuitBreaker(threshold=3, cooldown=30))
+    monkeypatch.setattr(sc, "SPOTIFY_HEDGE_AFTER", 0)
+    monkeypatch.setattr(sc, "SPOTIFY_MAX_RETRIES", 3)
+    monkeypatch.setattr(sc, "_rate_limited_until", 0.0)
+    monkeypatch.setattr(sc.time, "sleep", lambda seconds: None)
+    fake = FakeSpotify()
+    monkeypatch.setattr(sc, "_send", fake)
+    return fake
+
+
+def get():
+    return sc.spotify_get("https://api.spotify.com/v1/me", {})
+
+
+def failing_call():
+    with pytest.raises(requests.ConnectionError):
+        get()
+
+
+def open_breaker():
+    for _ in range(sc.breaker.threshold):
+        sc.breaker.record_failure()
+
+
+def expire_cooldown():
+    sc.breaker._opened_at = time.monotonic() - sc.breaker.cooldown - 1
+
+
+def test_call_that_exhausts_retries_counts_as_one_failure(spotify):
+    spotify.respond(requests.ConnectionError("down"))
+    failing_call()
+    failing_call()
+    assert len(spotify.sent) == 8
+    assert sc.breaker.state == "closed"
+
+    failing_call()
+    assert sc.breaker.state == "open"
+    with pytest.raises(sc.SpotifyUnavailable):
+        get()
+    assert len(spotify.sent) == 12
+
+
+def test_success_resets_the_failure_count(spotify):
+    spotify.respond(requests.ConnectionError("down"))
+    failing_call()
+    failing_call()
+    spotify.handler = lambda: FakeResponse(200)
+    assert get().status_code == 200
+    spotify.respond(requests.ConnectionError("down"))
+    failing_call()
+    assert sc.breaker.state == "closed"
+
+
+def test_retries_stop_once_another_call_opens_the_breaker(spotify):
+    def fail_and_open():
+        open_breaker()
+        raise requests.ConnectionError("down")
+    spotify.handler = fail_and_open
+    with pytest.raises(sc.SpotifyUnavailable):
+        get()
+    assert len(spotify.sent) == 1
+
+
+def test_half_open_lets_a_single_probe_through(spotify):
+    open_breaker()
+    assert not sc.breaker.allow()
+
+    expire_cooldown()
+    assert sc.breaker.state == "half_open"
+    assert sc.breaker.allow()
+    assert not sc.breaker.allow()
+
+    sc.breaker.record_success()
+    assert sc.breaker.state == "closed"
+    assert sc.breaker.allow()
+
+
+def test_probe_retries_then_reopens_the_breaker(spotify):
+    open_breaker()
+    expire_cooldown()
+    spotify.respond(FakeResponse(503))
+    assert get().status_code == 503
+    assert len(spotify.sent) == 4
+    assert sc.breaker.state == "open"
+
+
+def test_abandon_probe_only_releases_the_callers_probe(spotify):
+    open_breaker()
+    expire_cooldown()
+    assert sc.breaker.allow()
+
+    other = threading.Thread(target=sc.breaker.abandon_probe)
+    other.start()
+    other.join()
+    assert not sc.breaker.allow()
+
+    sc.breaker.abandon_probe()
+    assert sc.breaker.allow()
+
+
+def test_probe_is_released_when_an_unexpected_error_escapes(spotify):
+    open_breaker()
+    expire_cooldown()
+    spotify.respond(ValueError("bad params"))
+    with pytest.raises(ValueError):
+        get()
+    assert sc.breaker.allow()
+
+
+def test_retry_after_is_waited_out_and_retried(monkeypatch, spotify):
+    sleeps = []
+    monkeypatch.setattr(sc.time, "sleep", sleeps.append)
+    spotify.respond(FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200))
+    assert get().status_code == 200
+    assert len(spotify.sent) == 2
+    assert len(sleeps) == 1 and 1 < sleeps[0] <= 2
+    assert sc.breaker.state == "closed"
+
+
+def test_long_retry_after_fails_fast_until_it_passes(spotify):
+    spotify.respond(FakeResponse(429, {"Retry-After": str(sc.SPOTIFY_MAX_RETRY_AFTER + 60)}))
+    assert get().status_code == 429
+    with pytest.raises(sc.SpotifyUnavailable):
+        get()
+    assert len(spotify.sent) == 1
+    assert sc.breaker.state == "closed"
+
+
+def test_retry_after_parsing():
+    assert sc._retry_after(FakeResponse(429, {"Retry-After": "3"})) == 3.0
+    assert sc._retry_after(FakeResponse(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert sc._retry_after(FakeResponse(429, {"Retry-After": "soon"})) == 1.0
+    assert sc._retry_after(FakeResponse(429)) == 1.0
+
+
+def test_calls_beyond_the_hedge_cap_run_on_the_callers_thread(monkeypatch, spotify):
+    monkeypatch.setattr(sc, "SPOTIFY_HEDGE_AFTER", 1.5)
+    monkeypatch.setattr(sc, "_hedge_slots", threading.BoundedSemaphore(1))
+
+    assert sc._hedge_slots.acquire(blocking=False)
+    get()
+    sc._hedge_slots.release()
+    get()
+    assert spotify.threads[0] == threading.get_ident()
+    assert spotify.threads[1] != threading.get_ident()
+    # The slot comes back once the pooled request is done
+    assert sc._hedge_slots.acquire(timeout=1)
+
+
+def test_slow_primary_is_hedged_and_the_first_answer_wins(monkeypatch, spotify):
+    monkeypatch.setattr(sc, "SPOTIFY_HEDGE_AFTER", 0.05)
+    monkeypatch.setattr(sc, "_hedge_slots", threading.BoundedSemaphore(1))
+    release_primary = threading.Event()
+
+    def primary_hangs():
+        if len(spotify.sent) == 1:
+            release_primary.wait(5)
+            return FakeResponse(500)
+        return FakeResponse(200)
+    spotify.handler = primary_hangs
+
+    assert get().status_code == 200
+    assert len(spotify.sent) == 2
+    # The losing primary keeps the slot until it finishes
+    assert not sc._hedge_slots.acquire(blocking=False)
+    release_primary.set()
+    assert sc._hedge_slots.acquire(timeout=1)